@@ -0,0 +1,353 @@
+"""
+Benchmarks for the conversion path, run from the repository root:
+
+    python -m benchmarks.run                    # quick sizes, compare with baseline
+    python -m benchmarks.run --full             # include the largest sizes
+    python -m benchmarks.run --case end_to_end  # only cases whose name contains this
+    python -m benchmarks.run --save-baseline    # store results as the new baseline
+
+Every case runs in a fresh process so that its peak RSS is its own. The AUO
+provider is replaced by FixturePlantProvider and geocoding runs offline, so
+no case touches the network.
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCHMARK_DIR.parent
+BASELINE_PATH = BENCHMARK_DIR / "baseline.json"
+
+QUICK_DEVICE_COUNTS = [10, 100, 1_000, 10_000]
+FULL_DEVICE_COUNTS = QUICK_DEVICE_COUNTS + [100_000]
+QUICK_STATION_COUNTS = [10, 100, 1_000]
+FULL_STATION_COUNTS = QUICK_STATION_COUNTS + [10_000]
+
+# 與基準相比變慢超過此比例視為退步
+REGRESSION_THRESHOLD = 0.20
+
+
+def _peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # Linux 以 KB 為單位，macOS 以 bytes 為單位
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def _time_repeated(func: Callable[[], None], min_time: float = 0.5) -> Dict:
+    """重複執行直到累計超過 min_time 秒，回傳每次耗時的統計"""
+    samples: List[float] = []
+    start = time.perf_counter()
+    while not samples or time.perf_counter() - start < min_time:
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return _latency_stats(samples)
+
+
+def _latency_stats(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    return {
+        "runs": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def _make_plant(device_count: int):
+    from src.auo_device_parser import parse_plant
+    from src.gms_fixtures import GmsFixtures
+
+    fixtures = GmsFixtures(devices_per_plant=device_count)
+    return parse_plant(fixtures.device_tree(""), fixtures.plant_info(""))
+
+
+def _sample_row():
+    from src.station_reader import StationRow
+
+    return StationRow(
+        ["KH001", "環台-台南後壁-黃阿菊", "台南市", "後壁區", "後壁路1號", "0012", "06:77:80:40:5B:F8"]
+    )
+
+
+def bench_parse_devices(device_count: int) -> Dict:
+    from src.auo_device_parser import parse_plant
+    from src.gms_fixtures import GmsFixtures
+
+    fixtures = GmsFixtures(devices_per_plant=device_count)
+    device_tree, plant_info = fixtures.device_tree(""), fixtures.plant_info("")
+    return _time_repeated(lambda: parse_plant(device_tree, plant_info))
+
+
+def bench_parse_devices_raw(device_count: int) -> Dict:
+    """與 AUO provider 相同，從未解碼的回應內容解析"""
+    from src.auo_device_parser import parse_plant
+    from src.gms_fixtures import GmsFixtures
+
+    fixtures = GmsFixtures(devices_per_plant=device_count)
+    body = json.dumps(fixtures.device_tree(""), ensure_ascii=False).encode("utf-8")
+    plant_info = fixtures.plant_info("")
+    return _time_repeated(lambda: parse_plant(body, plant_info))
+
+
+def bench_device_list(device_count: int) -> Dict:
+    from src.device_list_processor import DeviceListProcessor
+    from src.workbook_template import get_workbook_template
+
+    plant, row = _make_plant(device_count), _sample_row()
+
+    def fill():
+        ws = get_workbook_template().new_workbook().device_list
+        processor = DeviceListProcessor(plant)
+        processor.fill_logger(ws, row)
+        processor.fill_pyranometer(ws)
+        processor.fill_thermometer(ws)
+        processor.fill_unused_device(ws)
+        processor.fill_inverter(ws)
+
+    return _time_repeated(fill)
+
+
+def bench_basic_info(_: int) -> Dict:
+    import openpyxl
+    from src.basic_info_processor import BasicInfoProcessor
+
+    processor, row = BasicInfoProcessor(offline=True), _sample_row()
+
+    def setup():
+        ws = processor.setup_basic_info_sheet(openpyxl.Workbook())
+        processor.fill_station_info(ws, row, (23.0, 120.0))
+
+    return _time_repeated(setup)
+
+
+def bench_workbook_save(device_count: int) -> Dict:
+    from io import BytesIO
+    from src.station_renderer import StationRecord, build_station_workbook
+
+    record = StationRecord(_sample_row(), _make_plant(device_count), (23.0, 120.0))
+    workbook = build_station_workbook(record)
+    return _time_repeated(lambda: workbook.save(BytesIO()))
+
+
+def _write_station_csv(path: str, station_count: int):
+    from src.gms_fixtures import GmsFixtures
+
+    plants = GmsFixtures().plant_list()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["電站代碼", "電站名稱", "地區", "CITY", "地址", "註冊碼", "假MAC"])
+        for index in range(station_count):
+            plant = plants[index % len(plants)]
+            writer.writerow(
+                [
+                    f"BM{index:06d}",
+                    plant["PlantName"],
+                    "台中市",
+                    "大肚區",
+                    f"仁德路{index}號",
+                    f"{index:06d}",
+                    "06:77:80:40:5B:F8",
+                ]
+            )
+
+
+@contextmanager
+def _in_temp_dir() -> Iterator[str]:
+    """在暫存目錄中執行，結束後回到原目錄並刪除產生的工作簿與快取"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="plant-bench-") as path:
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(cwd)
+
+
+def bench_end_to_end(station_count: int) -> Dict:
+    with _in_temp_dir():
+        return _bench_end_to_end(station_count)
+
+
+def _bench_end_to_end(station_count: int) -> Dict:
+    _write_station_csv("stations.csv", station_count)
+
+    from src.converter import PowerStationConverter
+
+    logging.getLogger().setLevel(logging.ERROR)
+    converter = PowerStationConverter("FAKE", offline=True)
+
+    # 逐站模式下量測每站從擷取到產生工作簿的耗時
+    samples: List[float] = []
+    process_station = converter._process_station
+
+    def timed_process_station(row):
+        t0 = time.perf_counter()
+        result = process_station(row)
+        samples.append(time.perf_counter() - t0)
+        return result
+
+    converter._process_station = timed_process_station
+
+    start = time.perf_counter()
+    converter.convert_csv_to_xlsx("stations.csv")
+    elapsed = time.perf_counter() - start
+
+    stats = _latency_stats(samples)
+    stats["stations_per_s"] = station_count / elapsed
+    return stats
+
+
+def _bench_cli(args: List[str], station_count: int) -> Dict:
+    """從新的直譯器執行 main.py，量測含啟動與模組載入的總耗時"""
+    with _in_temp_dir():
+        _write_station_csv("stations.csv", station_count)
+        command = [sys.executable, str(REPO_ROOT / "main.py"), "stations.csv", *args]
+        result = _time_repeated(
+            lambda: subprocess.run(command, check=True, capture_output=True),
+            min_time=2.0,
+        )
+    result["peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return result
+
+
+def bench_startup_validate(station_count: int) -> Dict:
+    return _bench_cli(["--validate"], station_count)
+
+
+def bench_startup_convert(station_count: int) -> Dict:
+    return _bench_cli(["--provider", "FAKE", "--offline"], station_count)
+
+
+CASES: Dict[str, Callable[[int], Dict]] = {
+    "parse_devices": bench_parse_devices,
+    "parse_devices_raw": bench_parse_devices_raw,
+    "device_list": bench_device_list,
+    "basic_info": bench_basic_info,
+    "workbook_save": bench_workbook_save,
+    "end_to_end": bench_end_to_end,
+    "startup_validate": bench_startup_validate,
+    "startup_convert": bench_startup_convert,
+}
+
+
+def _case_sizes(full: bool) -> Dict[str, List[int]]:
+    device_counts = FULL_DEVICE_COUNTS if full else QUICK_DEVICE_COUNTS
+    return {
+        "parse_devices": device_counts,
+        "parse_devices_raw": device_counts,
+        "device_list": device_counts,
+        "basic_info": [1],
+        "workbook_save": device_counts[:-1] if not full else device_counts,
+        "end_to_end": FULL_STATION_COUNTS if full else QUICK_STATION_COUNTS,
+        "startup_validate": [10],
+        "startup_convert": [1],
+    }
+
+
+def _run_case(case: str, size: int, queue):
+    sys.path.insert(0, str(REPO_ROOT))
+    os.chdir(REPO_ROOT)
+    try:
+        result = CASES[case](size)
+        result.setdefault("peak_rss_mb", _peak_rss_mb())
+        queue.put(result)
+    except Exception as e:
+        queue.put({"error": repr(e)})
+
+
+def run_case(case: str, size: int) -> Dict:
+    """在獨立行程中執行單一案例，避免彼此的記憶體用量互相影響"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_case, args=(case, size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def compare(results: Dict, baseline: Dict) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "error" in result or "error" in base:
+            continue
+        change = result["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        marker = ""
+        if change > REGRESSION_THRESHOLD:
+            marker = "  <-- regression"
+            regressions.append(name)
+        print(f"  {name:<28} p50 {change:+7.1%} vs baseline{marker}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="電站轉換效能測試")
+    parser.add_argument("--case", help="只執行名稱包含此字串的案例")
+    parser.add_argument("--full", action="store_true", help="包含最大的資料量")
+    parser.add_argument("--save-baseline", action="store_true", help="將結果存為新的基準")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="基準檔案路徑")
+    parser.add_argument("--output", help="將結果另存為 JSON")
+    parser.add_argument(
+        "--fail-on-regression", action="store_true", help="有案例退步時以非零狀態結束"
+    )
+    args = parser.parse_args(argv)
+
+    results = {}
+    for case, sizes in _case_sizes(args.full).items():
+        for size in sizes:
+            name = f"{case}[{size}]"
+            if args.case and args.case not in name:
+                continue
+            result = run_case(case, size)
+            results[name] = result
+            if "error" in result:
+                print(f"{name:<30} ERROR {result['error']}")
+                continue
+            throughput = (
+                f"  {result['stations_per_s']:9.1f} stations/s"
+                if "stations_per_s" in result
+                else ""
+            )
+            print(
+                f"{name:<30} p50 {result['p50_ms']:10.3f} ms  "
+                f"p95 {result['p95_ms']:10.3f} ms  "
+                f"rss {result['peak_rss_mb']:8.1f} MB{throughput}"
+            )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            baseline = json.loads(Path(args.baseline).read_text())
+        baseline.update(results)
+        Path(args.baseline).write_text(json.dumps(baseline, indent=2, sort_keys=True))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    print("Compared with baseline:")
+    regressions = compare(results, json.loads(Path(args.baseline).read_text()))
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,74 +1,332 @@
-import pandas as pd
+import os
+import sys
 import logging
-import openpyxl
+import argparse
+from datetime import date
+from typing import Optional
 from dotenv import load_dotenv
-from src.basic_info_processor import BasicInfoProcessor
-from src.auo_plant_provider import AUOPlantProvider
-from src.utils.logger import setup_logger
-from openpyxl.workbook.workbook import Workbook
-from src.device_list_processor import DeviceListProcessor
+from src.provider_registry import available_providers
+from src.sharding import Shard, merge_shards
+from src.station_reader import validate_station_rows
+from src.utils.logger import LOG_FILE, setup_logger
 
 load_dotenv()
-setup_logger()
 
 
-class PowerStationConverter:
-    def __init__(self, provider: str):
-        self.plant_provider = self._get_plant_provider(provider)
-        self.basic_info_processor = BasicInfoProcessor()
+def validate(input_file: str) -> int:
+    """檢查 CSV 後回傳結束代碼，有問題時為 1"""
+    try:
+        count, problems = validate_station_rows(input_file)
+    except (OSError, ValueError) as e:
+        logging.error(str(e))
+        return 1
+    for problem in problems:
+        logging.error(problem)
+    logging.info(f"{input_file}: {count} stations, {len(problems)} problems")
+    return 1 if problems else 0
 
-    def convert_csv_to_xlsx(self, input_file: str):
-        try:
-            df = pd.read_csv(input_file)
 
-            for _, row in df.iterrows():
-                try:
-                    workbook = openpyxl.Workbook()
-                    self._process_basic_info(workbook, row)
-                    self._process_device_list(workbook, row)
+def _shard(value: str) -> Shard:
+    try:
+        return Shard.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
 
-                    output_filename = f"{row['電站代碼']}.xlsx"
-                    workbook.save(output_filename)
-                    logging.info(f"Successfully processed station {row['電站代碼']}")
-                except Exception as e:
-                    logging.error(f"Error processing station {row['電站代碼']}: {str(e)}")
-                    continue
 
-            logging.info("All stations processed")
+def _run_date(value: str) -> str:
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}") from None
 
-        except Exception as e:
-            logging.error(f"Program execution error: {str(e)}")
 
-    def _get_plant_provider(self, provider: str):
-        providers = {
-            "AUO": AUOPlantProvider(),
-            # 'XXX': XXXDeviceProvider()
-        }
-        return providers.get(provider)
+def _worker_count(value: str) -> int:
+    count = int(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError("worker count must be at least 1")
+    return count
 
-    def _process_basic_info(self, workbook: Workbook, row: dict):
-        ws = self.basic_info_processor.setup_basic_info_sheet(workbook)
-        self.basic_info_processor.fill_station_info(ws, row)
 
-    def _process_device_list(self, workbook: Workbook, row: dict):
-        plant = self.plant_provider.fetch_plant(row["電站名稱"])
+def _rate(value: str) -> float:
+    rate = float(value)
+    if rate <= 0:
+        raise argparse.ArgumentTypeError("rate must be greater than 0")
+    return rate
 
-        device_list_processor = DeviceListProcessor(plant)
-        ws = device_list_processor.setup_device_list_sheet(workbook)
 
-        device_list_processor.fill_logger(ws, row)
-        device_list_processor.fill_pyranometer(ws)
-        device_list_processor.fill_thermometer(ws)
-        device_list_processor.fill_unused_device(ws)
-        device_list_processor.fill_inverter(ws)
+def _shard_count(value: str) -> int:
+    count = int(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError("shard count must be at least 1")
+    return count
 
 
 def main():
-    CSV_PATH = "template.csv"
-    PROVIDER = "AUO"  # or "XXX" depending on your needs
+    parser = argparse.ArgumentParser(description="將電站資料從 CSV 轉換為 Excel 檔案")
+    parser.add_argument(
+        "input", nargs="?", default="template.csv", help="電站資料 CSV 檔案路徑"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="略過上次已成功且輸入未變更的電站，只處理失敗或新增的電站",
+    )
+    parser.add_argument(
+        "--provider",
+        default="AUO",
+        help="電站資料來源（預設 AUO），FAKE 使用範例資料，也可用 entry point 註冊的名稱",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="只檢查 CSV 的欄位與電站代碼，不擷取資料也不輸出檔案",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="電站資料未變更時也重新產生輸出檔，例如範本變更後",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="有電站名稱找不到或對應多個電站時，不轉換任何電站",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="不連線，只使用先前快取的 AUO 回應與經緯度",
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="N",
+        type=_worker_count,
+        default=4,
+        help="同時處理的電站數（預設 4），設為 1 則逐站處理",
+    )
+    parser.add_argument(
+        "--geocode-rate",
+        metavar="R",
+        type=_rate,
+        default=10.0,
+        help="Google Maps API 每秒請求上限（預設 10）",
+    )
+    parser.add_argument(
+        "--write-only",
+        action="store_true",
+        help="以 openpyxl 的 write-only 模式串流寫出工作簿，裝置很多的電站較省記憶體",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        metavar="PATH",
+        help="記錄各階段耗時與 HTTP 請求數，結束時輸出為 JSON",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        metavar="PATH",
+        help="同上，輸出為 Prometheus node_exporter 的 textfile 格式",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="DIR",
+        help="另將擷取到的電站與裝置依執行日期存成 Parquet；"
+        "搭配 --provider SNAPSHOT 時改為讀取的目錄（預設 snapshots）",
+    )
+    parser.add_argument(
+        "--snapshot-date",
+        metavar="YYYY-MM-DD",
+        type=_run_date,
+        help="--provider SNAPSHOT 讀取此日期的快照，預設為最新一天",
+    )
+    parser.add_argument(
+        "--log-json",
+        metavar="PATH",
+        help="另外將日誌以 JSON lines 寫入此檔，含電站代碼與各階段耗時",
+    )
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--output-dir", default=".", help="每個電站輸出一個 xlsx 檔案的目錄")
+    output.add_argument("--zip", metavar="PATH", help="將所有電站的 xlsx 檔案打包成單一 ZIP 檔")
+    output.add_argument(
+        "--workbook",
+        metavar="PATH",
+        help="將所有電站寫入單一工作簿，附電站索引分頁",
+    )
+    sharding = parser.add_mutually_exclusive_group()
+    sharding.add_argument(
+        "--shard",
+        metavar="I/K",
+        type=_shard,
+        help="只處理第 I 個分片（共 K 個，依電站代碼雜湊分配），供多台機器分工",
+    )
+    sharding.add_argument(
+        "--shards",
+        metavar="K",
+        type=_shard_count,
+        help="分成 K 個分片，各以獨立行程同時處理，完成後合併結果",
+    )
+    sharding.add_argument(
+        "--merge-shards",
+        metavar="K",
+        type=_shard_count,
+        help="只合併 K 個分片的 manifest 與執行報告",
+    )
+    args = parser.parse_args()
+    setup_logger(**_log_files(args, args.shard))
 
-    converter = PowerStationConverter(PROVIDER)
-    converter.convert_csv_to_xlsx(CSV_PATH)
+    if args.validate:
+        sys.exit(validate(args.input))
+    if args.merge_shards:
+        report = merge_shards(args.merge_shards, _manifest_path(args))
+        sys.exit(1 if report["missing_shards"] else 0)
+    if args.provider not in available_providers():
+        parser.error(
+            f"unknown provider {args.provider!r} "
+            f"(choose from {', '.join(available_providers())})"
+        )
+
+    if args.snapshot_date and args.provider != "SNAPSHOT":
+        parser.error("--snapshot-date only applies to --provider SNAPSHOT")
+    if (args.snapshot or args.provider == "SNAPSHOT") and not _has_pyarrow():
+        parser.error(
+            "--snapshot and --provider SNAPSHOT need pyarrow: pip install pyarrow"
+        )
+
+    if args.shards:
+        convert_sharded(args)
+    else:
+        convert(args, args.shard)
+
+
+def _has_pyarrow() -> bool:
+    # 只檢查是否安裝，不在啟動時載入 pyarrow
+    from importlib.util import find_spec
+
+    return find_spec("pyarrow") is not None
+
+
+def _log_files(args: argparse.Namespace, shard: Optional[Shard]) -> dict:
+    """各分片寫入各自的日誌檔，多台機器共用目錄時也不會互相覆寫"""
+    filename, json_path = LOG_FILE, args.log_json
+    if shard is not None:
+        filename = shard.path(filename)
+        json_path = json_path and shard.path(json_path)
+    return {"filename": filename, "json_path": json_path}
+
+
+def _manifest_path(args: argparse.Namespace) -> str:
+    """
+    manifest 與輸出放在一起：每個輸出目錄各有一份，ZIP 與單一工作簿則另存一份，
+    換了輸出位置不會把其他位置的結果當成已完成
+    """
+    bundle = args.zip or args.workbook
+    if bundle:
+        return f"{bundle}.manifest.jsonl"
+    return os.path.normpath(os.path.join(args.output_dir, "manifest.jsonl"))
+
+
+def convert(args: argparse.Namespace, shard: Optional[Shard] = None):
+    # 轉換所需的 openpyxl、requests 等較重的模組在此才載入
+    from src.converter import PowerStationConverter
+    from src.output_sink import DirectorySink, WorkbookSink, ZipSink
+
+    if args.zip:
+        sink = ZipSink(shard.path(args.zip) if shard else args.zip)
+    elif args.workbook:
+        sink = WorkbookSink(shard.path(args.workbook) if shard else args.workbook)
+    else:
+        sink = DirectorySink(args.output_dir)
+
+    # 產生工作簿的行程數，設為 0 則不使用多行程；本機分片時由各分片平分
+    RENDER_PROCESSES = (os.cpu_count() or 1) // (args.shards or 1)
+
+    try:
+        converter = PowerStationConverter(
+            args.provider,
+            workers=args.workers,
+            geocode_rate=args.geocode_rate,
+            write_only=args.write_only,
+            render_processes=RENDER_PROCESSES,
+            manifest_path=_manifest_path(args),
+            offline=args.offline,
+            metrics_json=args.metrics_json,
+            metrics_prom=args.metrics_prom,
+            sink=sink,
+            strict=args.strict,
+            shard=shard,
+            snapshot_dir=args.snapshot,
+            snapshot_date=args.snapshot_date,
+            force=args.force,
+        )
+    except FileNotFoundError as e:
+        # 例如 --provider SNAPSHOT 找不到指定日期的快照
+        logging.error(str(e))
+        sink.abort()
+        sys.exit(1)
+    if not converter.convert_csv_to_xlsx(args.input, resume=args.resume):
+        sys.exit(1)
+
+
+def convert_shard(args: argparse.Namespace, shard: Shard):
+    """本機分片的子行程進入點，各自登入並使用各自的連線"""
+    setup_logger(**_log_files(args, shard))
+    convert(args, shard)
+
+
+def check_all_plant_names(args: argparse.Namespace) -> bool:
+    """
+    --strict 須以整份 CSV 判斷：只要有一個名稱有問題，任何分片都不轉換，
+    不能由各分片只看自己的電站各自決定
+    """
+    from src.converter import check_plant_names
+    from src.provider_registry import create_provider
+    from src.station_reader import read_station_rows
+
+    try:
+        provider = create_provider(
+            args.provider,
+            offline=args.offline,
+            snapshot_dir=args.snapshot,
+            snapshot_date=args.snapshot_date,
+        )
+    except FileNotFoundError as e:
+        logging.error(str(e))
+        return False
+    try:
+        check_plant_names(
+            provider,
+            (row["電站名稱"] for row in read_station_rows(args.input)),
+            strict=True,
+        )
+    except (OSError, ValueError) as e:
+        logging.error(str(e))
+        return False
+    finally:
+        provider.close()
+    return True
+
+
+def convert_sharded(args: argparse.Namespace):
+    import multiprocessing
+
+    if args.strict and not check_all_plant_names(args):
+        sys.exit(1)
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=convert_shard, args=(args, Shard(index, args.shards)))
+        for index in range(1, args.shards + 1)
+    ]
+    for process in processes:
+        process.start()
+    failed = []
+    for index, process in enumerate(processes, 1):
+        process.join()
+        if process.exitcode != 0:
+            logging.error(f"Shard {index}/{args.shards} exited with {process.exitcode}")
+            failed.append(index)
+    # 異常結束的分片可能已留下部分 manifest，合併時不會列為缺少，須另外判斷
+    report = merge_shards(args.shards, _manifest_path(args))
+    if failed or report["missing_shards"]:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+import json
+from io import BytesIO
+from typing import BinaryIO, Dict, Iterable, List, Tuple, Union
+from src.plant_provider import DeviceTable, Plant
+from src.utils.logger import get_logger
+from src.utils.metrics import metrics
+
+try:
+    # 逐筆讀取裝置樹，不必先載入整份回應；未安裝時退回 json.load
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = get_logger(__name__)
+_warned_without_ijson = False
+
+# unit_type 對應的裝置類別（Plant 的屬性）與裝置代碼中的類型縮寫，新增類型只需加一列
+DEVICE_TYPES: Dict[str, Tuple[str, str]] = {
+    "RADIATION": ("pyranometers", "PYR"),  # 日照計
+    "MODULE_THERMAL": ("thermometers", "THR"),  # 溫度計
+    "INVERTER": ("inverters", "INV"),  # 逆變器
+}
+
+DeviceTreeSource = Union[Dict, bytes, BinaryIO]
+
+# 同一類裝置的 power_collector_key、description、unit_id 三欄
+DeviceColumns = Tuple[List[str], List[str], List[str]]
+
+
+def iter_device_tree(device_data: DeviceTreeSource) -> Iterable[Dict]:
+    """
+    Yield the lstDeviceTree nodes of a GetDeviceTreeData response
+
+    Accepts the decoded response, its raw bytes, or a binary file object.
+    Raw input is parsed incrementally with ijson.
+    """
+    if isinstance(device_data, dict):
+        return device_data.get("lstDeviceTree", [])
+    if isinstance(device_data, (bytes, bytearray)):
+        device_data = BytesIO(device_data)
+    if ijson is not None:
+        return ijson.items(device_data, "lstDeviceTree.item")
+    _warn_without_ijson()
+    return json.load(device_data).get("lstDeviceTree", [])
+
+
+def _warn_without_ijson():
+    global _warned_without_ijson
+    if not _warned_without_ijson:
+        _warned_without_ijson = True
+        logger.warning(
+            "ijson is not installed, loading whole device trees into memory: "
+            "pip install -r requirements.txt"
+        )
+
+
+def group_devices(devices: Iterable[Dict]) -> Dict[str, DeviceColumns]:
+    """依 unit_type 分組，只保留產生 Device 所需的欄位，其餘類型略過"""
+    columns: Dict[str, DeviceColumns] = {
+        unit_type: ([], [], []) for unit_type in DEVICE_TYPES
+    }
+    for device in devices:
+        group = columns.get(device["unit_type"])
+        if group is None:
+            continue
+        group[0].append(device.get("power_collector_key", ""))
+        group[1].append(device["description"])
+        group[2].append(device["unit_id"])
+    return columns
+
+
+def build_device_ids(type_code: str, keys: List[str]) -> List[str]:
+    """Number one group of devices in tree order, e.g. BDL22206042-THR-01"""
+    return [f"{key}-{type_code}-{number:02d}" for number, key in enumerate(keys, 1)]
+
+
+@metrics.timed("parse_devices")
+def parse_plant(device_data: DeviceTreeSource, plant_info: Dict) -> Plant:
+    """Parse device data into Plant object"""
+    grid_connection_date = None
+
+    # Get grid connection date from plant info
+    if plant_info and "OnGridDate" in plant_info:
+        grid_connection_date = plant_info["OnGridDate"].split("T")[
+            0
+        ]  # Format: "2021-01-26T00:00:00" -> "2021-01-26"
+
+    columns = group_devices(iter_device_tree(device_data))
+    devices = DeviceTable()
+    for unit_type, (group, type_code) in DEVICE_TYPES.items():
+        keys, names, serials = columns[unit_type]
+        devices.add_group(group, names, serials, build_device_ids(type_code, keys))
+
+    return Plant(grid_connection_date=grid_connection_date, devices=devices)
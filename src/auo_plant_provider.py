@@ -1,31 +1,98 @@
 import os
+import json
+import time
+import threading
 import requests
-from typing import Optional, Dict
-from urllib.parse import unquote
-from src.plant_provider import PlantProvider, Plant, Device
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from requests.cookies import create_cookie
+from typing import Iterable, Optional, Dict
+from urllib.parse import urlparse
+from src.plant_provider import PlantProvider, Plant
+from src.auo_device_parser import parse_plant
+from src.plant_catalog import CatalogResolution, PlantCatalog
+from src.utils.http_cache import HttpCache
 from src.utils.logger import get_logger
+from src.utils.metrics import metrics
+from src.utils.outbound import get_outbound_client
 
 logger = get_logger(__name__)
 
+DEFAULT_BASE_URL = "https://gms.auo.com/MvcWebPortal"
+
+API_HEADERS = {
+    "Referer": "https://gms.auo.com/MvcWebPortal/Allsystem/index",
+    "Origin": "https://gms.auo.com",
+    "x-requested-with": "XMLHttpRequest",
+}
+
+# 各 API 回應的快取時間（秒），裝置樹很少變動可保留較久
+CACHE_TTLS = {
+    "GetPlantsReduce": 3600,
+    "GetOnePlantInfo": 24 * 3600,
+    "GetDeviceTreeData": 7 * 24 * 3600,
+}
+
+# 登入後的 cookie，供之後的執行與其他行程沿用
+SESSION_COOKIE_PATH = "cache/auo_session.json"
+
+# 登入失敗後，這段時間（秒）內不再重試，避免帳號因連續登入失敗被鎖定
+LOGIN_RETRY_INTERVAL = 60
+
 
 class AUOPlantProvider(PlantProvider):
+    # 連線池大小，需不小於同時請求數，否則多出的連線會被丟棄重建
+    POOL_SIZE = 16
+
     _instance = None
     _session: Optional[requests.Session] = None
+    _session_lock = threading.Lock()
+    _login_failed_at: Optional[float] = None
+    _catalog: Optional[PlantCatalog] = None
+    _catalog_lock = threading.RLock()
+    _http_cache: Optional[HttpCache] = None
+    # 與裝置樹同時送出電站資訊請求的共用執行緒，第一次使用時才建立
+    _request_executor: Optional[ThreadPoolExecutor] = None
 
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(AUOPlantProvider, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        if not self._session:
-            self._session = self._login()
+    def __init__(
+        self,
+        offline: bool = False,
+        http_cache: Optional[HttpCache] = None,
+        cookie_path: str = SESSION_COOKIE_PATH,
+    ):
+        # 離線模式只讀取快取，不登入也不發出任何請求
+        self.offline = offline
+        # 可指向本機的模擬伺服器，見 src/gms_stub_server.py
+        self.base_url = os.getenv("AUO_GMS_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+        self.cookie_path = cookie_path
+        # 快取的回應只對同一伺服器與帳號有效，與 cookie 相同
+        scope = f"{self.base_url}|{os.getenv('AUO_GMS_ACCOUNT') or ''}|"
+        if http_cache is not None:
+            self._http_cache = http_cache
+        elif self._http_cache is None or self._http_cache.scope != scope:
+            if self._http_cache is not None:
+                self._http_cache.close()
+            self._http_cache = HttpCache(ttls=CACHE_TTLS, scope=scope)
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
 
+    @metrics.timed("login")
     def _login(self) -> Optional[requests.Session]:
         """Login to AUO system and return session"""
         try:
-            session = requests.Session()
-            login_url = "https://gms.auo.com/MvcWebPortal/Login/Login3"
+            session = self._new_session()
+            login_url = f"{self.base_url}/Login/Login3"
             headers = {
                 "Content-Type": "application/json",
                 "Referer": "https://gms.auo.com/MvcWebPortal/",
@@ -38,45 +105,221 @@ class AUOPlantProvider(PlantProvider):
                 "RememberMe": True,
             }
 
-            response = session.post(login_url, headers=headers, json=login_data)
+            response = get_outbound_client().request(
+                "POST", login_url, session=session, headers=headers, json=login_data
+            )
             if response.status_code == 200:
+                self._save_cookies(session)
                 return session
             return None
         except Exception as e:
-            print(f"Login failed: {str(e)}")
+            logger.error(f"Login failed: {str(e)}")
             return None
 
-    def _get_plant_no(self, plant_name: str) -> Optional[str]:
-        """Get plant number from station code"""
-        try:
-            headers = {
-                "Referer": "https://gms.auo.com/MvcWebPortal/Allsystem/index",
-                "Origin": "https://gms.auo.com",
-                "x-requested-with": "XMLHttpRequest",
+    def _try_login(self) -> Optional[requests.Session]:
+        """Log in unless the last attempt failed less than LOGIN_RETRY_INTERVAL ago"""
+        now = time.monotonic()
+        failed_at = self._login_failed_at
+        if failed_at is not None and now - failed_at < LOGIN_RETRY_INTERVAL:
+            return None
+        session = self._login()
+        self._login_failed_at = None if session else now
+        return session
+
+    def _save_cookies(self, session: requests.Session):
+        cookies = [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": cookie.secure,
+                "expires": cookie.expires,
             }
-            response = self._session.get(
-                "https://gms.auo.com/MvcWebPortal/api/GetPlantsReduce?special_flag=Y",
-                headers=headers,
+            for cookie in session.cookies
+        ]
+        data = {"base_url": self.base_url, "cookies": cookies}
+        try:
+            Path(self.cookie_path).parent.mkdir(parents=True, exist_ok=True)
+            # cookie 等同登入憑證，只允許本人讀取
+            # 分片執行時其他行程可能同時寫入，暫存檔以 pid 區分
+            tmp_path = f"{self.cookie_path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cookie_path)
+        except OSError as e:
+            logger.warning(f"Could not save AUO session cookies: {e}")
+
+    def _load_session(self) -> Optional[requests.Session]:
+        """Restore the session saved by an earlier login against the same server"""
+        try:
+            with open(self.cookie_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("base_url") != self.base_url:
+            return None
+
+        session = self._new_session()
+        now = time.time()
+        for cookie in data.get("cookies", []):
+            if cookie.get("expires") is not None and cookie["expires"] < now:
+                continue
+            session.cookies.set_cookie(create_cookie(**cookie))
+        if not session.cookies:
+            return None
+        logger.info("Reusing saved AUO session")
+        return session
+
+    def _ensure_session(self) -> requests.Session:
+        """Return the shared session, restoring or logging in on first use"""
+        session = self._session
+        if session is not None:
+            return session
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._load_session() or self._try_login()
+            if self._session is None:
+                raise Exception("Not logged in")
+            return self._session
+
+    def _reauthenticate(self, expired: requests.Session) -> requests.Session:
+        """
+        Replace an expired session with a fresh login
+
+        Workers that hit the expiry at the same time wait on the lock; only
+        the first logs in and the rest pick up its session.
+        """
+        with self._session_lock:
+            if self._session is expired:
+                logger.info("AUO session expired, logging in again")
+                self._session = self._try_login()
+            if self._session is None:
+                raise Exception("Not logged in")
+            return self._session
+
+    @staticmethod
+    def _is_session_expired(response: requests.Response) -> bool:
+        """Session 失效時 API 會回覆 401/403，或被導向登入頁而回傳 HTML"""
+        if response.status_code in (401, 403):
+            return True
+        if response.history and "/login" in response.url.lower():
+            return True
+        content_type = response.headers.get("Content-Type", "")
+        return response.status_code == 200 and "text/html" in content_type
+
+    def _get_json(
+        self, endpoint: str, params: Optional[Dict] = None, raw: bool = False
+    ):
+        """
+        GET an AUO API endpoint, serving and revalidating through the cache
+
+        With raw=True the undecoded response body is returned, so large
+        responses can be parsed incrementally by the caller.
+        """
+        decode = bytes if raw else json.loads
+        cached = self._http_cache.lookup(endpoint, params)
+        if cached is not None and (cached.fresh or self.offline):
+            metrics.increment("http_cache_total", endpoint=endpoint, result="hit")
+            return decode(cached.body)
+        if self.offline:
+            raise Exception(f"{endpoint} is not cached (offline mode)")
+
+        headers = dict(API_HEADERS)
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        url = f"{self.base_url}/api/{endpoint}"
+        outbound = get_outbound_client()
+        session = self._ensure_session()
+        response = outbound.request(
+            "GET", url, session=session, headers=headers, params=params
+        )
+        if self._is_session_expired(response):
+            # 重新登入後只重試一次，仍失效就當作一般的失敗
+            metrics.increment(
+                "http_retries_total",
+                host=urlparse(url).netloc,
+                reason="session_expired",
+            )
+            session = self._reauthenticate(session)
+            response = outbound.request(
+                "GET", url, session=session, headers=headers, params=params
             )
+        metrics.increment(
+            "http_requests_total", endpoint=endpoint, status=response.status_code
+        )
+        metrics.increment(
+            "http_response_bytes_total", len(response.content), endpoint=endpoint
+        )
 
-            if response.status_code == 200:
-                plants = response.json()
-                for plant in plants:
-                    if plant_name in plant["PlantName"]:
-                        return unquote(plant["PlantNo"])
+        if response.status_code == 304 and cached is not None:
+            metrics.increment(
+                "http_cache_total", endpoint=endpoint, result="revalidated"
+            )
+            self._http_cache.revalidate(endpoint, params)
+            return decode(cached.body)
+        if response.status_code == 200:
+            metrics.increment("http_cache_total", endpoint=endpoint, result="miss")
+            if raw:
+                # 不解析內容，至少確認回應是 JSON 再寫入快取
+                if "json" not in response.headers.get("Content-Type", ""):
+                    raise Exception(f"{endpoint} did not return JSON")
+                data = response.content
+            else:
+                data = response.json()
+            self._http_cache.store(
+                endpoint,
+                params,
+                response.content,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            return data
+        return None
+
+    @metrics.timed("catalog")
+    def refresh_catalog(self) -> Optional[PlantCatalog]:
+        """Download the plant list and rebuild the plant catalog index"""
+        with self._catalog_lock:
+            try:
+                plants = self._get_json("GetPlantsReduce", {"special_flag": "Y"})
+                if plants is not None:
+                    self._catalog = PlantCatalog.from_response(plants)
+            except Exception as e:
+                logger.error(f"Failed to get plant list: {str(e)}")
+            return self._catalog
+
+    def _get_catalog(self) -> Optional[PlantCatalog]:
+        """Return the cached plant catalog, fetching it on first use"""
+        if self._catalog is None:
+            with self._catalog_lock:
+                if self._catalog is None:
+                    self.refresh_catalog()
+        return self._catalog
+
+    def _get_plant_no(self, plant_name: str) -> Optional[str]:
+        """Get plant number from station code"""
+        catalog = self._get_catalog()
+        if catalog is None:
             return None
-        except Exception as e:
-            print(f"Failed to get plant number: {str(e)}")
+        return catalog.lookup(plant_name)
+
+    @metrics.timed("resolve_plants")
+    def resolve_plants(self, plant_names: Iterable[str]) -> Optional[CatalogResolution]:
+        catalog = self._get_catalog()
+        if catalog is None:
             return None
+        return catalog.resolve_all(plant_names)
 
-    def _get_device_list(self, plant_no: str) -> Optional[Dict]:
-        """Get device list for a specific plant"""
+    @metrics.timed("device_tree")
+    def _get_device_list(self, plant_no: str) -> Optional[bytes]:
+        """Get the raw device tree for a specific plant"""
         try:
-            headers = {
-                "Referer": "https://gms.auo.com/MvcWebPortal/Allsystem/index",
-                "Origin": "https://gms.auo.com",
-                "x-requested-with": "XMLHttpRequest",
-            }
             params = {
                 "plant_no": plant_no,
                 "timeType": "UTC",
@@ -85,113 +328,65 @@ class AUOPlantProvider(PlantProvider):
                 "lang": "zh-TW",
                 "PlantType": "BENQDL",
             }
-            response = self._session.get(
-                "https://gms.auo.com/MvcWebPortal/api/GetDeviceTreeData",
-                headers=headers,
-                params=params,
-            )
-
-            if response.status_code == 200:
-                return response.json()
-            return None
+            return self._get_json("GetDeviceTreeData", params, raw=True)
         except Exception as e:
-            print(f"Failed to get device list: {str(e)}")
+            logger.error(f"Failed to get device list: {str(e)}")
             return None
 
+    @metrics.timed("plant_info")
     def _get_plant_info(self, plant_no: str) -> Optional[Dict]:
         """Get detailed plant information including grid connection date"""
         try:
-            headers = {
-                "Referer": "https://gms.auo.com/MvcWebPortal/Allsystem/index",
-                "Origin": "https://gms.auo.com",
-                "x-requested-with": "XMLHttpRequest",
-            }
             params = {"plantNo": plant_no, "format": "json"}
-            response = self._session.get(
-                "https://gms.auo.com/MvcWebPortal/api/GetOnePlantInfo",
-                headers=headers,
-                params=params,
-            )
-
-            if response.status_code == 200:
-                return response.json()
-            return None
+            return self._get_json("GetOnePlantInfo", params)
         except Exception as e:
-            print(f"Failed to get plant info: {str(e)}")
+            logger.error(f"Failed to get plant info: {str(e)}")
             return None
 
-    def _parse_devices(self, device_data: Dict, plant_info: Dict) -> Plant:
+    def _parse_devices(self, device_data: bytes, plant_info: Dict) -> Plant:
         """Parse device data into Plant object"""
-        pyranometers = []
-        thermometers = []
-        inverters = []
-        grid_connection_date = None
-
-        # Get grid connection date from plant info
-        if plant_info and "OnGridDate" in plant_info:
-            grid_connection_date = plant_info["OnGridDate"].split("T")[
-                0
-            ]  # Format: "2021-01-26T00:00:00" -> "2021-01-26"
-
-        # 計數器字典
-        device_counters = {"PYR": 0, "THR": 0, "INV": 0}  # 日照計  # 溫度計  # 逆變器
-
-        for device in device_data.get("lstDeviceTree", []):
-            power_collector_key = device.get("power_collector_key", "")
-
-            if device["unit_type"] == "MODULE_THERMAL":
-                device_counters["THR"] += 1
-                device_id = f"{power_collector_key}-THR-{device_counters['THR']:02d}"  # e.g. BDL22206042-THR-01
-                thermometers.append(
-                    Device(
-                        device_name=device["description"],
-                        device_serial_number=device["unit_id"],
-                        device_id=device_id,
-                    )
-                )
-            elif device["unit_type"] == "INVERTER":
-                device_counters["INV"] += 1
-                device_id = f"{power_collector_key}-INV-{device_counters['INV']:02d}"
-                inverters.append(
-                    Device(
-                        device_name=device["description"],
-                        device_serial_number=device["unit_id"],
-                        device_id=device_id,
-                    )
-                )
-            elif device["unit_type"] == "RADIATION":
-                device_counters["PYR"] += 1
-                device_id = f"{power_collector_key}-PYR-{device_counters['PYR']:02d}"
-                pyranometers.append(
-                    Device(
-                        device_name=device["description"],
-                        device_serial_number=device["unit_id"],
-                        device_id=device_id,
-                    )
-                )
+        return parse_plant(device_data, plant_info)
 
-        return Plant(
-            grid_connection_date=grid_connection_date,
-            pyranometers=pyranometers,
-            thermometers=thermometers,
-            inverters=inverters,
-        )
+    def report(self):
+        self._http_cache.report()
 
-    def fetch_plant(self, plant_name: str) -> Plant:
-        """Fetch device information for a station"""
-        if not self._session:
-            raise Exception("Not logged in")
+    def close(self):
+        if self._http_cache is not None:
+            self._http_cache.close()
+            self._http_cache = None
 
+    def _plant_no(self, plant_name: str) -> str:
         plant_no = self._get_plant_no(plant_name)
         if not plant_no:
             raise Exception(f"Plant not found for station: {plant_name}")
+        return plant_no
 
-        plant_info = self._get_plant_info(plant_no)
+    def _build_plant(
+        self, plant_no: str, plant_info: Optional[Dict], device_data
+    ) -> Plant:
         if not plant_info:
             raise Exception(f"Failed to get plant info for plant: {plant_no}")
-
-        device_data = self._get_device_list(plant_no)
         if not device_data:
             raise Exception(f"Failed to get device data for plant: {plant_no}")
-
         return self._parse_devices(device_data, plant_info)
+
+    @classmethod
+    def _request_pool(cls) -> ThreadPoolExecutor:
+        with cls._session_lock:
+            if cls._request_executor is None:
+                cls._request_executor = ThreadPoolExecutor(
+                    max_workers=cls.POOL_SIZE, thread_name_prefix="auo-request"
+                )
+            return cls._request_executor
+
+    def fetch_plant(self, plant_name: str) -> Plant:
+        """Fetch device information for a station"""
+        if not self.offline:
+            self._ensure_session()
+
+        plant_no = self._plant_no(plant_name)
+        # 電站資訊與裝置列表只依賴 plant_no，可同時發出；由共用的執行緒送出電站資訊，
+        # 不必為每個電站建立 event loop
+        plant_info = self._request_pool().submit(self._get_plant_info, plant_no)
+        device_data = self._get_device_list(plant_no)
+        return self._build_plant(plant_no, plant_info.result(), device_data)
@@ -1,100 +1,171 @@
-from openpyxl.styles import PatternFill, Font
-from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.workbook.workbook import Workbook
 import requests
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
 from src.constants.constants import SheetNames
+from src.constants.sheet_styles import SheetStyles
+from src.geocode_cache import Coordinates, GeocodeCache, normalize_address
+from src.utils.metrics import metrics
+from src.utils.outbound import get_outbound_client
+from src.utils.rate_limiter import RateLimiter
+from src.sheet_writer import SheetWriter, open_sheet
+
+# Google 明確回覆查無結果的狀態，會以較短的 TTL 快取
+NEGATIVE_GEOCODE_STATUSES = {"ZERO_RESULTS"}
+
+
+def _over_query_limit(response: requests.Response) -> bool:
+    """Google 超過配額時仍回覆 200，需從內容判斷"""
+    try:
+        return response.json().get("status") == "OVER_QUERY_LIMIT"
+    except ValueError:
+        return False
 
 
 class BasicInfoProcessor:
-    def __init__(self):
+    def __init__(
+        self,
+        geocode_cache: Optional[GeocodeCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        offline: bool = False,
+    ):
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+        self.geocode_cache = geocode_cache
+        self.rate_limiter = rate_limiter
+        # 離線模式只使用快取中的經緯度
+        self.offline = offline
 
-    def setup_basic_info_sheet(self, workbook: Workbook) -> Worksheet:
+    def setup_basic_info_sheet(
+        self, workbook: Workbook, title: str = SheetNames.BASIC_INFO.value
+    ) -> SheetWriter:
         """
         設置基本資訊分頁的格式和結構
         """
-        if SheetNames.BASIC_INFO.value in workbook.sheetnames:
-            sheet = workbook[SheetNames.BASIC_INFO.value]
-        else:
-            sheet = workbook.create_sheet(SheetNames.BASIC_INFO.value)
+        sheet = open_sheet(workbook, title)
 
         # 刪除默認的 Sheet
         if "Sheet" in workbook.sheetnames:
             del workbook["Sheet"]
 
-        sheet.column_dimensions["A"].width = 20
-        sheet.column_dimensions["B"].width = 40
-        sheet.column_dimensions["C"].width = 40
+        sheet.set_column_widths({"A": 20, "B": 40, "C": 40})
 
         # 設置標題行
-        headers = [
-            ("電站資訊", "A1"),
-            ("答案", "B1"),
-        ]
-
-        for header_text, cell in headers:
-            sheet[cell] = header_text
-            sheet[cell].font = Font(bold=True, color="FFFFFF")
-            sheet[cell].fill = PatternFill(
-                start_color="1C4587", end_color="1C4587", fill_type="solid"
-            )
+        sheet.write_row(1, [("電站資訊", "A"), ("答案", "B")], SheetStyles.BASIC_INFO_HEADER)
 
         # 設置基本資訊欄位
         info_fields = [
-            ("地區", "A2"),
-            ("電站代碼", "A3"),
-            ("電站名稱", "A4"),
-            ("地址", "A5"),
-            ("緯度", "A6"),
-            ("經度", "A7"),
-            ("併聯日期", "A8"),
-            ("電力結構", "A9"),
-            ("註冊碼", "A10"),
+            "地區",
+            "電站代碼",
+            "電站名稱",
+            "地址",
+            "緯度",
+            "經度",
+            "併聯日期",
+            "電力結構",
+            "註冊碼",
         ]
 
-        for field, cell in info_fields:
-            sheet[cell] = field
+        for row, field in enumerate(info_fields, start=2):
+            sheet.write_row(row, [(field, "A")])
 
         return sheet
 
-    def fill_station_info(self, sheet: Worksheet, csv_row: dict):
+    def fill_station_info(
+        self,
+        sheet: SheetWriter,
+        csv_row: dict,
+        coordinates: Optional[Coordinates] = None,
+    ):
         """
-        填充電站基本資訊到指定的工作表
+        填充電站基本資訊到指定的工作表，未提供經緯度時即時查詢
         """
         # 填充動態資料
-        sheet["B2"] = csv_row["地區"]
-        sheet["B3"] = csv_row["電站代碼"]
-        sheet["B4"] = csv_row["電站名稱"]
-        sheet["B5"] = csv_row["地址"]
+        sheet.write_row(2, [(csv_row["地區"], "B")])
+        sheet.write_row(3, [(csv_row["電站代碼"], "B")])
+        sheet.write_row(4, [(csv_row["電站名稱"], "B")])
+        sheet.write_row(5, [(csv_row["地址"], "B")])
 
         # 處理經緯度
-        full_address = f"{csv_row['地區']}{csv_row['CITY']}{csv_row['地址']}"
-        lat, lng = self.get_coordinates_from_google(full_address)
+        if coordinates is None:
+            coordinates = self.get_coordinates_from_google(self.full_address(csv_row))
+        lat, lng = coordinates
         if lat and lng:
-            sheet["B6"] = lat
-            sheet["B7"] = lng
+            sheet.write_row(6, [(lat, "B")])
+            sheet.write_row(7, [(lng, "B")])
 
         # 設置固定值
-        sheet["B9"] = "純光電"
-        sheet["B10"] = csv_row["註冊碼"]
+        sheet.write_row(9, [("純光電", "B")])
+        sheet.write_row(10, [(csv_row["註冊碼"], "B")])
+
+    @staticmethod
+    def full_address(csv_row: dict) -> str:
+        return f"{csv_row['地區']}{csv_row['CITY']}{csv_row['地址']}"
+
+    def resolve_addresses(
+        self, csv_rows: Iterable[dict], workers: int = 8
+    ) -> Dict[str, Coordinates]:
+        """
+        預先查詢所有列的經緯度，相同地址只查詢一次
+        回傳以正規化地址為鍵的經緯度對照表
+        """
+        addresses: Dict[str, str] = {}
+        row_count = 0
+        for csv_row in csv_rows:
+            address = self.full_address(csv_row)
+            addresses.setdefault(normalize_address(address), address)
+            row_count += 1
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = executor.map(self.get_coordinates_from_google, addresses.values())
+            coordinates = dict(zip(addresses.keys(), results))
+
+        logging.info(
+            f"Resolved {len(coordinates)} unique addresses from {row_count} rows"
+        )
+        return coordinates
 
     def get_coordinates_from_google(self, address):
         """
-        從 Google Maps API 獲取地址的經緯度
+        從 Google Maps API 獲取地址的經緯度，有快取時優先讀取快取
         """
+        if self.geocode_cache is not None:
+            cached = self.geocode_cache.get(address)
+            if cached is not None:
+                return cached
+        if self.offline:
+            return None, None
+
         try:
             base_url = "https://maps.googleapis.com/maps/api/geocode/json"
             params = {"address": address, "key": self.api_key}
-            response = requests.get(base_url, params=params)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            with metrics.span("geocode"):
+                response = get_outbound_client().request(
+                    "GET", base_url, params=params, throttled=_over_query_limit
+                )
+            metrics.increment(
+                "http_requests_total", endpoint="geocode", status=response.status_code
+            )
+            metrics.increment(
+                "http_response_bytes_total", len(response.content), endpoint="geocode"
+            )
             data = response.json()
 
             if data["status"] == "OK":
                 location = data["results"][0]["geometry"]["location"]
+                if self.geocode_cache is not None:
+                    self.geocode_cache.set(address, location["lat"], location["lng"])
                 return location["lat"], location["lng"]
             else:
                 logging.error(f"無法獲取地址'{address}'的經緯度: {data['status']}")
+                if (
+                    self.geocode_cache is not None
+                    and data["status"] in NEGATIVE_GEOCODE_STATUSES
+                ):
+                    self.geocode_cache.set(address, None, None)
                 return None, None
         except Exception as e:
             logging.error(f"調用 Google Maps API 時發生錯誤: {str(e)}")
@@ -4,3 +4,4 @@ from enum import Enum
 class SheetNames(Enum):
     BASIC_INFO = "電站基本資訊 v8"
     DEVICE_LIST = "裝置列表"
+    STATION_INDEX = "電站索引"
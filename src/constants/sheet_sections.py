@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from src.constants.sheet_headers import SheetHeaders
+from src.constants.sheet_examples import SheetExamples
+from src.constants.sheet_styles import SheetStyles
+from src.sheet_writer import RowTemplate
+
+
+@dataclass(frozen=True)
+class SectionTemplate:
+    header: RowTemplate
+    example: RowTemplate
+
+
+def _section(headers, example) -> SectionTemplate:
+    return SectionTemplate(
+        header=RowTemplate(headers, SheetStyles.DEVICE_HEADER),
+        example=RowTemplate(example, SheetStyles.DEVICE_EXAMPLE),
+    )
+
+
+@dataclass
+class DeviceSections:
+    """裝置列表各區塊的表頭與範例列，於載入時預先解析一次"""
+
+    LOGGER = _section(SheetHeaders.LOGGER_HEADERS, SheetExamples.LOGGER_EXAMPLE)
+    PYRANOMETER = _section(
+        SheetHeaders.PYRANOMETER_HEADERS, SheetExamples.PYRANOMETER_EXAMPLE
+    )
+    THERMOMETER = _section(
+        SheetHeaders.THERMOMETER_HEADERS, SheetExamples.THERMOMETER_EXAMPLE
+    )
+    ANEMOMETER = _section(
+        SheetHeaders.ANEMOMETER_HEADERS, SheetExamples.ANEMOMETER_EXAMPLE
+    )
+    POWER_METER = _section(
+        SheetHeaders.POWER_METER_HEADERS, SheetExamples.POWER_METER_EXAMPLE
+    )
+    PROTECTION_RELAY = _section(
+        SheetHeaders.PROTECTION_RELAY_HEADERS, SheetExamples.PROTECTION_RELAY_EXAMPLE
+    )
+    INVERTER = _section(SheetHeaders.INVERTER_HEADERS, SheetExamples.INVERTER_EXAMPLE)
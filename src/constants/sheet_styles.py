@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+from openpyxl.styles import Font, PatternFill
+
+
+@dataclass(frozen=True)
+class CellStyle:
+    font: Font
+    fill: PatternFill
+
+
+@dataclass
+class SheetStyles:
+    BASIC_INFO_HEADER = CellStyle(
+        font=Font(bold=True, color="FFFFFF"),
+        fill=PatternFill(start_color="1C4587", end_color="1C4587", fill_type="solid"),
+    )
+
+    DEVICE_HEADER = CellStyle(
+        font=Font(bold=True, color="FFFFFF"),
+        fill=PatternFill(start_color="38761C", end_color="38761C", fill_type="solid"),
+    )
+
+    DEVICE_EXAMPLE = CellStyle(
+        font=Font(color="000000"),
+        fill=PatternFill(start_color="F3F3F3", end_color="F3F3F3", fill_type="solid"),
+    )
@@ -0,0 +1,421 @@
+import logging
+import multiprocessing
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Iterator, NamedTuple, Optional, Set
+from src.basic_info_processor import BasicInfoProcessor
+from src.geocode_cache import GeocodeCache, normalize_address
+from src.plant_provider import PlantProvider
+from src.provider_registry import create_provider
+from src.utils.rate_limiter import RateLimiter
+from src.utils.metrics import metrics
+from src.utils.outbound import get_outbound_client
+from src.station_reader import StationRow, read_station_rows
+from src.output_sink import DirectorySink, OutputSink
+from src.station_renderer import (
+    StationRecord,
+    render_station,
+    render_station_in_worker,
+)
+from src.sharding import Shard, write_shard_report
+from src.run_manifest import (
+    STATUS_FAILED,
+    STATUS_OK,
+    ManifestEntry,
+    RunManifest,
+    hash_record,
+    hash_row,
+)
+
+
+def _render_context() -> multiprocessing.context.BaseContext:
+    """
+    渲染行程在擷取執行緒第一次送出工作時才啟動，此時其他執行緒可能正持有
+    HTTP、經緯度快取、計時或日誌的鎖；fork 會複製到已被持有的鎖而卡住，
+    因此改由乾淨的行程啟動（Windows 沒有 forkserver，使用 spawn）
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def check_plant_names(
+    provider: PlantProvider, plant_names: Iterable[str], strict: bool = False
+) -> Set[str]:
+    """
+    Resolve all plant names up front and log the unmatched and ambiguous ones
+
+    Returns the unmatched names, or an empty set when the provider cannot
+    tell in advance. With strict set, raises ValueError if any name is
+    unmatched or ambiguous.
+    """
+    resolution = provider.resolve_plants(plant_names)
+    if resolution is None:
+        return set()
+
+    logging.info(
+        f"Plant names: {len(resolution.plant_nos)} resolved, "
+        f"{len(resolution.unmatched)} unmatched, "
+        f"{len(resolution.ambiguous)} ambiguous"
+    )
+    for name in resolution.unmatched:
+        logging.error(f"Plant not found for station: {name}")
+    for name in resolution.ambiguous:
+        logging.warning(f"Ambiguous plant name: {name}")
+    if strict and (resolution.unmatched or resolution.ambiguous):
+        raise ValueError(
+            f"{len(resolution.unmatched)} unmatched and "
+            f"{len(resolution.ambiguous)} ambiguous plant names, not converting"
+        )
+    return set(resolution.unmatched)
+
+
+class StationResult(NamedTuple):
+    row: StationRow
+    content: Optional[bytes]  # 已壓縮的 xlsx 內容，資料未變更時為 None
+    error: Optional[Exception]
+    plant_hash: Optional[str] = None
+    record: Optional[StationRecord] = None  # 交由 sink 自行填寫時才有值
+
+
+class PowerStationConverter:
+    def __init__(
+        self,
+        provider: str,
+        workers: int = 1,
+        geocode_workers: int = 8,
+        geocode_rate: float = 10.0,
+        write_only: bool = False,
+        render_processes: int = 0,
+        manifest_path: str = "manifest.jsonl",
+        offline: bool = False,
+        metrics_json: Optional[str] = None,
+        metrics_prom: Optional[str] = None,
+        sink: Optional[OutputSink] = None,
+        strict: bool = False,
+        shard: Optional[Shard] = None,
+        snapshot_dir: Optional[str] = None,
+        snapshot_date: Optional[str] = None,
+        force: bool = False,
+    ):
+        self.offline = offline
+        self.plant_provider = create_provider(
+            provider,
+            offline=offline,
+            snapshot_dir=snapshot_dir,
+            snapshot_date=snapshot_date,
+        )
+        self.geocode_cache = GeocodeCache()
+        self.basic_info_processor = BasicInfoProcessor(
+            self.geocode_cache, RateLimiter(geocode_rate), offline=offline
+        )
+        self.workers = max(1, workers)
+        self.geocode_workers = geocode_workers
+        # 大型電站可使用 openpyxl 的 write-only 模式串流寫出
+        self.write_only = write_only
+        # 大於 0 時改由多個行程產生工作簿，擷取資料仍由執行緒處理
+        self.render_processes = render_processes
+        self.coordinates = {}
+        # 分片時只處理 電站代碼 雜湊到此分片的電站，manifest 與報告各自獨立
+        self.shard = shard
+        if shard is not None:
+            manifest_path = shard.path(manifest_path)
+            metrics_json = metrics_json and shard.path(metrics_json)
+            metrics_prom = metrics_prom and shard.path(metrics_prom)
+        self.manifest_path = manifest_path
+        # 輸出位置，預設為目前目錄下每站一個檔案；轉換結束時關閉
+        self.sink = sink or DirectorySink()
+        self.manifest: Optional[RunManifest] = None
+        self.summary = Counter()
+        # 指定輸出路徑時才啟用計時，否則各階段的 span 不做任何事
+        self.metrics_json = metrics_json
+        self.metrics_prom = metrics_prom
+        if metrics_json or metrics_prom:
+            metrics.enable()
+        # 有找不到或對應多個電站的名稱時，不開始轉換
+        self.strict = strict
+        # 指定時將擷取到的電站另存為 Parquet，之後可不連線重新產生工作簿；
+        # 由快照讀取時 snapshot_dir 是來源，不再另存一份
+        self.snapshot_dir = snapshot_dir if provider != "SNAPSHOT" else None
+        self.snapshot = None
+        # 範本變更後須重新產生，不沿用資料未變更的輸出檔
+        self.force = force
+
+    def convert_csv_to_xlsx(self, input_file: str, resume: bool = False) -> bool:
+        """
+        Convert every station of input_file
+
+        Returns False when the run stopped early, e.g. on a missing column or
+        a --strict refusal; failures of single stations are recorded in the
+        manifest and do not count.
+        """
+        if resume and not self.sink.keeps_outputs:
+            logging.warning("Resume needs per-station output files, ignoring it")
+            resume = False
+
+        self.manifest = RunManifest(self.manifest_path)
+        self.summary = Counter()
+        started_at = time.time()
+        completed = False
+        try:
+            if self.snapshot_dir:
+                # pyarrow 較重，只在需要時載入
+                from src.plant_snapshot import PlantSnapshotWriter
+
+                self.snapshot = PlantSnapshotWriter(self.snapshot_dir)
+
+            # 先一次比對所有電站名稱，找不到的電站不必查詢經緯度
+            unmatched = self._resolve_plant_names(input_file, resume)
+
+            # 先批次查詢所有地址的經緯度，產生工作簿時不再等待 Google API
+            self.coordinates = self.basic_info_processor.resolve_addresses(
+                (
+                    row
+                    for row in self._read_rows(input_file, resume)
+                    if row["電站名稱"] not in unmatched
+                ),
+                self.geocode_workers,
+            )
+
+            rows = self._read_rows(input_file, resume, log_skipped=True)
+
+            # sink 自行填寫工作簿時不需另外產生 xlsx，不使用行程池
+            if self.render_processes > 0 and not self.sink.consumes_records:
+                results = self._process_pipelined(rows)
+            elif self.workers > 1:
+                results = self._process_concurrently(rows)
+            else:
+                results = (self._process_station(row) for row in rows)
+
+            # 結果依輸入順序寫出，與站點完成的先後無關
+            for result in results:
+                self._write_result(result)
+
+            logging.info(
+                "All stations processed: "
+                + ", ".join(
+                    f"{count} {status}" for status, count in self.summary.items()
+                )
+            )
+            completed = True
+
+        except Exception as e:
+            logging.error(f"Program execution error: {str(e)}")
+        finally:
+            # 中止時不寫出 ZIP 或單一工作簿，保留上次完整的結果
+            if completed:
+                self.sink.close()
+            else:
+                self.sink.abort()
+            self.manifest.close()
+            if self.snapshot is not None:
+                # 快照寫不出來時仍要輸出報告與計時
+                try:
+                    self.snapshot.close()
+                except Exception as e:
+                    logging.error(f"Failed to save plant snapshot: {str(e)}")
+                else:
+                    logging.info(
+                        f"Saved {self.snapshot.count} plants to snapshot "
+                        f"{self.snapshot.run_date}/{self.snapshot.snapshot_id}"
+                    )
+            self.geocode_cache.report()
+            self.geocode_cache.close()
+            self.plant_provider.report()
+            self.plant_provider.close()
+            get_outbound_client().report()
+            self._export_metrics()
+            if self.shard is not None:
+                write_shard_report(self.shard, self.summary, started_at)
+        return completed
+
+    def _export_metrics(self):
+        if not metrics.enabled:
+            return
+        metrics.log_summary()
+        if self.metrics_json:
+            metrics.write_json(self.metrics_json)
+        if self.metrics_prom:
+            metrics.write_prometheus(self.metrics_prom)
+
+    def _resolve_plant_names(self, input_file: str, resume: bool) -> Set[str]:
+        """回傳找不到對應電站的名稱；provider 無法預先比對時為空集合"""
+        return check_plant_names(
+            self.plant_provider,
+            (row["電站名稱"] for row in self._read_rows(input_file, resume)),
+            self.strict,
+        )
+
+    def _read_rows(
+        self, input_file: str, resume: bool, log_skipped: bool = False
+    ) -> Iterator[StationRow]:
+        """續跑模式下略過上次已成功且輸入未變更的電站"""
+        for row in read_station_rows(input_file):
+            if self.shard is not None and not self.shard.contains(row["電站代碼"]):
+                continue
+            if resume and self.manifest.is_done(
+                row["電站代碼"], hash_row(row), self.sink.output_path(row["電站代碼"])
+            ):
+                if log_skipped:
+                    logging.info(f"Skipping completed station {row['電站代碼']}")
+                    self.summary["skipped"] += 1
+                continue
+            yield row
+
+    def _process_concurrently(
+        self, rows: Iterable[StationRow]
+    ) -> Iterator[StationResult]:
+        """Run stations on a thread pool, yielding results in input order"""
+        max_pending = self.workers * 2
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for row in rows:
+                pending.append(executor.submit(self._process_station, row))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _process_pipelined(self, rows: Iterable[StationRow]) -> Iterator[StationResult]:
+        """
+        Fetch stations on a thread pool and render them on a process pool.
+
+        At most `max_pending` stations are in flight between the two stages,
+        so a slow stage holds back the CSV reader instead of piling up
+        fetched plants in memory. Results are yielded in input order.
+        """
+        max_pending = (self.workers + self.render_processes) * 2
+        with ThreadPoolExecutor(
+            max_workers=self.workers
+        ) as fetch_pool, ProcessPoolExecutor(
+            max_workers=self.render_processes, mp_context=_render_context()
+        ) as render_pool:
+            pending = deque()
+            for row in rows:
+                pending.append(self._submit_pipelined(row, fetch_pool, render_pool))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _submit_pipelined(
+        self,
+        row: StationRow,
+        fetch_pool: ThreadPoolExecutor,
+        render_pool: ProcessPoolExecutor,
+    ) -> Future:
+        result = Future()
+
+        def on_rendered(render_future: Future, plant_hash: str):
+            error = render_future.exception()
+            content = None
+            if error is None:
+                content, worker_metrics = render_future.result()
+                if worker_metrics is not None:
+                    metrics.merge(worker_metrics)
+            result.set_result(StationResult(row, content, error, plant_hash))
+
+        def on_fetched(fetch_future: Future):
+            error = fetch_future.exception()
+            if error is not None:
+                result.set_result(StationResult(row, None, error))
+                return
+            try:
+                record = fetch_future.result()
+                plant_hash = hash_record(record)
+                if self._is_unchanged(row, plant_hash):
+                    result.set_result(StationResult(row, None, None, plant_hash))
+                    return
+                render_future = render_pool.submit(
+                    render_station_in_worker, record, self.write_only, metrics.enabled
+                )
+            except Exception as e:
+                result.set_result(StationResult(row, None, e))
+                return
+            render_future.add_done_callback(lambda f: on_rendered(f, plant_hash))
+
+        fetch_pool.submit(self._fetch_station, row).add_done_callback(on_fetched)
+        return result
+
+    def _process_station(self, row: StationRow) -> StationResult:
+        try:
+            record = self._fetch_station(row)
+            plant_hash = hash_record(record)
+            if self._is_unchanged(row, plant_hash):
+                return StationResult(row, None, None, plant_hash)
+            if self.sink.consumes_records:
+                return StationResult(row, None, None, plant_hash, record)
+
+            with metrics.station(row["電站代碼"]), metrics.span("render"):
+                content = render_station(record, self.write_only)
+            return StationResult(row, content, None, plant_hash)
+        except Exception as e:
+            return StationResult(row, None, e)
+
+    def _is_unchanged(self, row: StationRow, plant_hash: str) -> bool:
+        """輸入與電站資料皆與上次成功時相同，可沿用既有的輸出檔"""
+        if self.force or not self.sink.keeps_outputs:
+            return False
+        station_code = row["電站代碼"]
+        return self.manifest.is_unchanged(
+            station_code, hash_row(row), plant_hash, self.sink.output_path(station_code)
+        )
+
+    def _fetch_station(self, row: StationRow) -> StationRecord:
+        """擷取單一電站產生工作簿所需的全部外部資料"""
+        with metrics.station(row["電站代碼"]), metrics.span("fetch"):
+            plant = self.plant_provider.fetch_plant(row["電站名稱"])
+            if self.snapshot is not None:
+                self.snapshot.add(row["電站代碼"], row["電站名稱"], plant)
+
+            full_address = self.basic_info_processor.full_address(row)
+            coordinates = self.coordinates.get(normalize_address(full_address))
+            if coordinates is None:
+                coordinates = self.basic_info_processor.get_coordinates_from_google(
+                    full_address
+                )
+
+        return StationRecord(row=row, plant=plant, coordinates=coordinates)
+
+    def _write_result(self, result: StationResult):
+        station_code = result.row["電站代碼"]
+        entry = ManifestEntry(
+            station_code=station_code,
+            status=STATUS_OK,
+            input_hash=hash_row(result.row),
+            plant_hash=result.plant_hash,
+        )
+        try:
+            if result.error is not None:
+                raise result.error
+
+            with metrics.station(station_code), metrics.span("write"):
+                if result.record is not None:
+                    entry.output = self.sink.write_record(result.record)
+                elif result.content is not None:
+                    entry.output = self.sink.write(station_code, result.content)
+                    metrics.increment("output_bytes_total", len(result.content))
+                else:
+                    logging.info(f"Station {station_code} unchanged, keeping output")
+                    self.summary["unchanged"] += 1
+                    return
+
+            logging.info(
+                f"Successfully processed station {station_code}",
+                extra={
+                    "station": station_code,
+                    "durations": metrics.station_durations(station_code),
+                },
+            )
+            self.summary["processed"] += 1
+        except Exception as e:
+            logging.error(
+                f"Error processing station {station_code}: {str(e)}",
+                extra={"station": station_code},
+            )
+            self.summary["failed"] += 1
+            entry.status = STATUS_FAILED
+            entry.output = None
+            entry.error = str(e)
+        self.manifest.record(entry)
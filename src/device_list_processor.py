@@ -1,11 +1,50 @@
+import re
+from typing import List, NamedTuple
 from openpyxl.workbook.workbook import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
 from src.constants.constants import SheetNames
-from src.constants.sheet_headers import SheetHeaders
-from src.constants.sheet_examples import SheetExamples
-from openpyxl.styles import Font, PatternFill
+from src.constants.sheet_sections import DeviceSections, SectionTemplate
+from src.device_table import DeviceView
 from src.plant_provider import Plant
-from typing import List, Tuple
+from src.sheet_writer import ColumnCells, RowTemplate, SheetWriter, open_sheet
+
+# 各類裝置每列相同的欄位，於載入時預先解析一次
+PYRANOMETER_CELLS = RowTemplate([("ADTEK_CS1", "C"), ("2", "D"), ("9600,N,8,1", "E")])
+THERMOMETER_CELLS = RowTemplate(
+    [("ADTEK_CS1", "C"), ("2", "D"), ("9600, N, 8, 1", "E")]
+)
+INVERTER_CELLS = RowTemplate([("9600, N, 8, 1", "E")])
+# 變流器的裝置序號如 COM1_001，開頭為接線的 RS485 埠
+INVERTER_PORT = re.compile(r"COM(\d+)_")
+DEFAULT_INVERTER_PORT = "1"  # 與範例列相同
+
+
+def inverter_ports(serial_numbers: List[str]) -> List[str]:
+    """由裝置序號取出各變流器的 RS485 埠，序號沒有埠號時使用 1 埠"""
+    ports = []
+    for serial_number in serial_numbers:
+        match = INVERTER_PORT.match(serial_number or "")
+        ports.append(match.group(1) if match else DEFAULT_INVERTER_PORT)
+    return ports
+
+
+class DeviceBlock(NamedTuple):
+    """一個區塊內所有裝置的版面：所在列、Modbus ID 與裝置代碼"""
+
+    rows: range
+    modbus_ids: range
+    device_ids: List[str]
+
+    @classmethod
+    def layout(
+        cls, devices: DeviceView, first_row: int, first_modbus_id: int
+    ) -> "DeviceBlock":
+        _, _, device_ids = devices.columns()
+        count = len(device_ids)
+        return cls(
+            range(first_row, first_row + count),
+            range(first_modbus_id, first_modbus_id + count),
+            device_ids,
+        )
 
 
 class DeviceListProcessor:
@@ -14,94 +53,90 @@ class DeviceListProcessor:
         self.current_row = 1
         self.current_modbus_id = 1
 
-    def setup_device_list_sheet(self, workbook: Workbook) -> Worksheet:
-        if SheetNames.DEVICE_LIST.value in workbook.sheetnames:
-            sheet = workbook[SheetNames.DEVICE_LIST.value]
-        else:
-            sheet = workbook.create_sheet(SheetNames.DEVICE_LIST.value)
+    def setup_device_list_sheet(
+        self, workbook: Workbook, title: str = SheetNames.DEVICE_LIST.value
+    ) -> SheetWriter:
+        sheet = open_sheet(workbook, title)
 
-        sheet.sheet_format.defaultColWidth = 15
-        sheet.column_dimensions["B"].width = 30
-        sheet.column_dimensions["C"].width = 30
+        sheet.set_default_column_width(15)
+        sheet.set_column_widths({"B": 30, "C": 30})
 
         return sheet
 
-    def _fill_headers(self, sheet: Worksheet, headers: List[Tuple[str, str]]):
-        """直接填充表頭"""
-        for header_text, col in headers:
-            cell = f"{col}{self.current_row}"
-            sheet[cell] = header_text
-            sheet[cell].font = Font(bold=True, color="FFFFFF")
-            sheet[cell].fill = PatternFill(
-                start_color="38761C", end_color="38761C", fill_type="solid"
-            )
-        self.current_row += 1
-
-    def _fill_example(self, sheet: Worksheet, examples: List[Tuple[str, str]]):
-        """直接填充範例"""
-        for example_text, col in examples:
-            cell = f"{col}{self.current_row}"
-            sheet[cell] = example_text
-            sheet[cell].font = Font(color="000000")
-            sheet[cell].fill = PatternFill(
-                start_color="F3F3F3", end_color="F3F3F3", fill_type="solid"
-            )
-        self.current_row += 1
+    def _fill_section(self, sheet: SheetWriter, section: SectionTemplate):
+        """填充預先解析好的表頭與範例列"""
+        sheet.write_template(self.current_row, section.header)
+        sheet.write_template(self.current_row + 1, section.example)
+        self.current_row += 2
 
-    def fill_logger(self, sheet: Worksheet, row: dict):
+    def fill_logger(self, sheet: SheetWriter, row: dict):
         self.current_row = 1
-        self._fill_headers(sheet, SheetHeaders.LOGGER_HEADERS)
-        self._fill_example(sheet, SheetExamples.LOGGER_EXAMPLE)
+        self._fill_section(sheet, DeviceSections.LOGGER)
 
-        sheet["B3"] = row["假MAC"]
-        sheet["C3"] = "PT-2020"
+        sheet.write_row(3, [(row["假MAC"], "B"), ("PT-2020", "C")])
         self.current_row += 1
         self.current_row += 1
 
-    def fill_pyranometer(self, sheet: Worksheet):
+    def _fill_devices(
+        self,
+        sheet: SheetWriter,
+        section: SectionTemplate,
+        devices: DeviceView,
+        cells: RowTemplate,
+        first_modbus_id: int,
+        columns: ColumnCells = (),
+    ) -> DeviceBlock:
+        """先算出整個區塊的版面，再整欄寫入，不逐一處理裝置"""
+        self._fill_section(sheet, section)
+        block = DeviceBlock.layout(devices, self.current_row, first_modbus_id)
+        sheet.write_columns(
+            self.current_row,
+            [(block.device_ids, "B"), (block.modbus_ids, "H"), *columns],
+            cells,
+        )
+        self.current_row = block.rows.stop + 1
+        return block
+
+    def fill_pyranometer(self, sheet: SheetWriter):
         """填充日照計資訊"""
-        self._fill_headers(sheet, SheetHeaders.PYRANOMETER_HEADERS)
-        self._fill_example(sheet, SheetExamples.PYRANOMETER_EXAMPLE)
-
-        for pyranometer in self.plant.pyranometers:
-            sheet[f"B{self.current_row}"] = pyranometer.device_id
-            sheet[f"C{self.current_row}"] = "ADTEK_CS1"
-            sheet[f"D{self.current_row}"] = "2"
-            sheet[f"E{self.current_row}"] = "9600,N,8,1"
-            sheet[f"H{self.current_row}"] = self.current_modbus_id
-            self.current_modbus_id += 1
-            self.current_row += 1
-
+        block = self._fill_devices(
+            sheet,
+            DeviceSections.PYRANOMETER,
+            self.plant.pyranometers,
+            PYRANOMETER_CELLS,
+            self.current_modbus_id,
+        )
+        self.current_modbus_id = block.modbus_ids.stop
+
+    def fill_thermometer(self, sheet: SheetWriter):
+        # 與日照計接在同一個 RS485 埠，Modbus ID 接續編號
+        block = self._fill_devices(
+            sheet,
+            DeviceSections.THERMOMETER,
+            self.plant.thermometers,
+            THERMOMETER_CELLS,
+            self.current_modbus_id,
+        )
+        self.current_modbus_id = block.modbus_ids.stop
+
+    def fill_unused_device(self, sheet: SheetWriter):
+        self._fill_section(sheet, DeviceSections.ANEMOMETER)
         self.current_row += 1
 
-    def fill_thermometer(self, sheet: Worksheet):
-        self._fill_headers(sheet, SheetHeaders.THERMOMETER_HEADERS)
-        self._fill_example(sheet, SheetExamples.THERMOMETER_EXAMPLE)
-
-        for thermometer in self.plant.thermometers:
-            sheet[f"B{self.current_row}"] = thermometer.device_id
-            sheet[f"C{self.current_row}"] = "ADTEK_CS1"
-            sheet[f"D{self.current_row}"] = "2"
-            sheet[f"E{self.current_row}"] = "9600, N, 8, 1"
-            sheet[f"H{self.current_row}"] = self.current_modbus_id
-            self.current_modbus_id += 1
-            self.current_row += 1
+        self._fill_section(sheet, DeviceSections.POWER_METER)
         self.current_row += 1
 
-    def fill_unused_device(self, sheet: Worksheet):
-        self._fill_headers(sheet, SheetHeaders.ANEMOMETER_HEADERS)
-        self._fill_example(sheet, SheetExamples.ANEMOMETER_EXAMPLE)
+        self._fill_section(sheet, DeviceSections.PROTECTION_RELAY)
         self.current_row += 1
 
-        self._fill_headers(sheet, SheetHeaders.POWER_METER_HEADERS)
-        self._fill_example(sheet, SheetExamples.POWER_METER_EXAMPLE)
-        self.current_row += 1
-
-        self._fill_headers(sheet, SheetHeaders.PROTECTION_RELAY_HEADERS)
-        self._fill_example(sheet, SheetExamples.PROTECTION_RELAY_EXAMPLE)
-        self.current_row += 1
-
-    def fill_inverter(self, sheet: Worksheet):
-        self._fill_headers(sheet, SheetHeaders.INVERTER_HEADERS)
-        self._fill_example(sheet, SheetExamples.INVERTER_EXAMPLE)
-        self.current_row += 1
+    def fill_inverter(self, sheet: SheetWriter):
+        # 變流器接在各自的 RS485 埠，不與日照計共用，Modbus ID 從 1 起算
+        _, serial_numbers, _ = self.plant.inverters.columns()
+        self._fill_devices(
+            sheet,
+            DeviceSections.INVERTER,
+            self.plant.inverters,
+            INVERTER_CELLS,
+            1,
+            [(inverter_ports(serial_numbers), "D")],
+        )
@@ -0,0 +1,192 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+
+@dataclass
+class Device:
+    device_name: str
+    device_serial_number: str  # 裝置序號
+    device_id: str  # 裝置代碼
+
+
+class DeviceRow:
+    """Read-only view of one row of a DeviceTable, with Device's attributes"""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "DeviceTable", index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def device_name(self) -> str:
+        return self._table.names[self._index]
+
+    @property
+    def device_serial_number(self) -> str:
+        return self._table.serial_numbers[self._index]
+
+    @property
+    def device_id(self) -> str:
+        return self._table.ids[self._index]
+
+    def to_device(self) -> Device:
+        return Device(self.device_name, self.device_serial_number, self.device_id)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (DeviceRow, Device)):
+            return NotImplemented
+        return (
+            self.device_name == other.device_name
+            and self.device_serial_number == other.device_serial_number
+            and self.device_id == other.device_id
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"DeviceRow(device_name={self.device_name!r}, "
+            f"device_serial_number={self.device_serial_number!r}, "
+            f"device_id={self.device_id!r})"
+        )
+
+
+class DeviceView(Sequence):
+    """A contiguous range of a DeviceTable; slicing returns another view"""
+
+    __slots__ = ("_table", "_range")
+
+    def __init__(self, table: "DeviceTable", rows: range):
+        self._table = table
+        self._range = rows
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return DeviceView(self._table, self._range[index])
+        return DeviceRow(self._table, self._range[index])
+
+    def __iter__(self) -> Iterator[DeviceRow]:
+        table = self._table
+        return (DeviceRow(table, index) for index in self._range)
+
+    def columns(self) -> Tuple[List[str], List[str], List[str]]:
+        """名稱、序號、代碼三欄，逐列寫出時比逐一讀取 DeviceRow 快"""
+        table, start, stop = self._table, self._range.start, self._range.stop
+        if self._range.step != 1:
+            rows = self._range
+            return (
+                [table.names[i] for i in rows],
+                [table.serial_numbers[i] for i in rows],
+                [table.ids[i] for i in rows],
+            )
+        return (
+            table.names[start:stop],
+            table.serial_numbers[start:stop],
+            table.ids[start:stop],
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"DeviceView({list(self)!r})"
+
+
+class DeviceTable:
+    """
+    Columnar storage for all devices of a plant
+
+    Each device is one row across the names / serial_numbers / ids columns.
+    Devices of a group (pyranometers, inverters, ...) are stored contiguously,
+    so group() is a view over a range of rows rather than a copy.
+    """
+
+    __slots__ = ("names", "serial_numbers", "ids", "_groups")
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.serial_numbers: List[str] = []
+        self.ids: List[str] = []
+        self._groups: Dict[str, range] = {}
+
+    @classmethod
+    def from_devices(cls, groups: Dict[str, Iterable[Device]]) -> "DeviceTable":
+        table = cls()
+        for group, devices in groups.items():
+            devices = list(devices)
+            table.add_group(
+                group,
+                [device.device_name for device in devices],
+                [device.device_serial_number for device in devices],
+                [device.device_id for device in devices],
+            )
+        return table
+
+    def add_group(
+        self,
+        group: str,
+        names: List[str],
+        serial_numbers: List[str],
+        ids: List[str],
+    ):
+        if group in self._groups:
+            raise ValueError(f"Device group already added: {group}")
+        if not len(names) == len(serial_numbers) == len(ids):
+            raise ValueError(f"Device columns of {group} differ in length")
+
+        start = len(self.ids)
+        self.names.extend(names)
+        self.serial_numbers.extend(serial_numbers)
+        self.ids.extend(ids)
+        self._groups[group] = range(start, len(self.ids))
+
+    def group(self, group: str) -> DeviceView:
+        """該類裝置的檢視，未加入過的類別視為空"""
+        return DeviceView(self, self._groups.get(group, range(0)))
+
+    def groups(self) -> Iterator[str]:
+        return iter(self._groups)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[DeviceRow]:
+        return iter(DeviceView(self, range(len(self.ids))))
+
+    def to_dict(self) -> Dict[str, List[Dict[str, str]]]:
+        return {
+            group: [
+                {
+                    "device_name": row.device_name,
+                    "device_serial_number": row.device_serial_number,
+                    "device_id": row.device_id,
+                }
+                for row in self.group(group)
+            ]
+            for group in self._groups
+        }
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DeviceTable):
+            return NotImplemented
+        return (
+            self._groups == other._groups
+            and self.ids == other.ids
+            and self.names == other.names
+            and self.serial_numbers == other.serial_numbers
+        )
+
+    def __getstate__(self):
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+    def __setstate__(self, state):
+        for attr, value in zip(self.__slots__, state):
+            setattr(self, attr, value)
+
+    def __repr__(self) -> str:
+        sizes = ", ".join(f"{g}={len(r)}" for g, r in self._groups.items())
+        return f"DeviceTable({sizes})"
@@ -0,0 +1,31 @@
+import time
+from typing import Iterable, Optional
+from src.auo_device_parser import parse_plant
+from src.gms_fixtures import GmsFixtures
+from src.plant_catalog import CatalogResolution, PlantCatalog
+from src.plant_provider import Plant, PlantProvider
+
+
+class FixturePlantProvider(PlantProvider):
+    """Serves plants from the fake/ fixtures without any network access"""
+
+    def __init__(self, fixtures: Optional[GmsFixtures] = None, latency: float = 0.0):
+        self.fixtures = fixtures or GmsFixtures()
+        # 模擬每次擷取電站的網路延遲（秒）
+        self.latency = latency
+        self._catalog = PlantCatalog.from_response(self.fixtures.plant_list())
+
+    def resolve_plants(self, plant_names: Iterable[str]) -> CatalogResolution:
+        return self._catalog.resolve_all(plant_names)
+
+    def fetch_plant(self, plant_name: str) -> Plant:
+        if self.latency:
+            time.sleep(self.latency)
+
+        plant_no = self._catalog.lookup(plant_name)
+        if not plant_no:
+            raise Exception(f"Plant not found for station: {plant_name}")
+
+        return parse_plant(
+            self.fixtures.device_tree(plant_no), self.fixtures.plant_info(plant_no)
+        )
@@ -0,0 +1,133 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+Coordinates = Tuple[Optional[float], Optional[float]]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_address(address: str) -> str:
+    """全形轉半形並移除所有空白，作為地址比對與快取的鍵"""
+    return _WHITESPACE.sub("", unicodedata.normalize("NFKC", str(address)))
+
+
+class GeocodeCache:
+    """SQLite-backed cache of geocoding results keyed by normalized address"""
+
+    # 每寫入多少筆檢查一次是否超過容量上限
+    EVICTION_CHECK_INTERVAL = 100
+
+    def __init__(
+        self,
+        path: str = "cache/geocode.sqlite3",
+        ttl: float = 30 * 24 * 3600,
+        negative_ttl: float = 24 * 3600,
+        max_entries: int = 100_000,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        # 命中時只記在記憶體，隨下一次寫入或 close 一併更新，讀取不必取得寫入鎖
+        self._accessed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # 分片執行時多個行程共用同一檔案，寫入時等候其他行程的鎖
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS geocode (
+                address TEXT PRIMARY KEY,
+                lat REAL,
+                lng REAL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS geocode_accessed_at ON geocode (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, address: str) -> Optional[Coordinates]:
+        """Return cached coordinates, (None, None) for a cached miss, or None"""
+        key = normalize_address(address)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lat, lng, expires_at FROM geocode WHERE address = ?", (key,)
+            ).fetchone()
+            if row is None or row[2] < now:
+                self.misses += 1
+                return None
+
+            self._accessed[key] = now
+            self.hits += 1
+            return row[0], row[1]
+
+    def set(self, address: str, lat: Optional[float], lng: Optional[float]):
+        """Store coordinates; pass None for an address that could not be resolved"""
+        key = normalize_address(address)
+        now = time.time()
+        ttl = self.ttl if lat is not None and lng is not None else self.negative_ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)",
+                (key, lat, lng, now + ttl, now),
+            )
+            self._accessed.pop(key, None)
+            self._flush_accessed()
+            self._writes += 1
+            if self._writes % self.EVICTION_CHECK_INTERVAL == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _flush_accessed(self):
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE geocode SET accessed_at = ? WHERE address = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed = {}
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM geocode WHERE expires_at < ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            # 依最後存取時間淘汰最舊的項目
+            self._conn.execute(
+                """
+                DELETE FROM geocode WHERE address IN (
+                    SELECT address FROM geocode ORDER BY accessed_at LIMIT ?
+                )
+                """,
+                (excess,),
+            )
+
+    def report(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0.0
+        logger.info(
+            f"Geocode cache: {self.hits} hits, {self.misses} misses "
+            f"({hit_rate:.1%} hit rate)"
+        )
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._evict(time.time())
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,91 @@
+import copy
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / "fake"
+
+
+class GmsFixtures:
+    """
+    Canned AUO GMS responses built from the JSON files in fake/
+
+    Without scaling every plant in plantList.json answers with plant.json and
+    plantDeviceList.json. Passing `plants` and/or `devices_per_plant` instead
+    synthesizes that many plants, each with that many devices, from the same
+    fixture records.
+    """
+
+    def __init__(
+        self,
+        fixture_dir: Path = FIXTURE_DIR,
+        plants: Optional[int] = None,
+        devices_per_plant: Optional[int] = None,
+    ):
+        fixture_dir = Path(fixture_dir)
+        self._plant_list = self._load(fixture_dir / "plantList.json")
+        self._plant_info = self._load(fixture_dir / "plant.json")
+        self._device_tree = self._load(fixture_dir / "plantDeviceList.json")
+
+        if plants is not None:
+            self._plant_list = [
+                {
+                    "PlantNo": self.synthetic_plant_no(index),
+                    "PlantName": self.synthetic_plant_name(index),
+                    "SW_Version": "ADVANCED",
+                }
+                for index in range(1, plants + 1)
+            ]
+        if devices_per_plant is not None:
+            self._device_tree = self._scale_device_tree(devices_per_plant)
+
+    @staticmethod
+    def _load(path: Path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def synthetic_plant_no(index: int) -> str:
+        return f"SYN{index:06d}"
+
+    @staticmethod
+    def synthetic_plant_name(index: int) -> str:
+        return f"合成電站-{index:06d}"
+
+    def _scale_device_tree(self, device_count: int) -> Dict:
+        """以樣本中各類裝置為範本，產生指定數量的裝置：日照計與溫度計各約 1%，其餘為變流器"""
+        templates: Dict[str, Dict] = {}
+        for device in self._device_tree["lstDeviceTree"]:
+            templates.setdefault(device["unit_type"], device)
+
+        sensors = max(1, device_count // 100)
+        counts = [
+            ("RADIATION", sensors),
+            ("MODULE_THERMAL", sensors),
+            ("INVERTER", max(0, device_count - 2 * sensors)),
+        ]
+
+        devices = [copy.deepcopy(templates["BENQDL"])] if "BENQDL" in templates else []
+        port = 0
+        for unit_type, count in counts:
+            template = templates[unit_type]
+            model = template["description"].rsplit(" ", 1)[0]
+            for _ in range(count):
+                port += 1
+                unit_id = f"COM{port // 1000 + 1}_{port % 1000:03d}"
+                device = dict(template)
+                device["unit_id"] = unit_id
+                device["device_tree_id"] = f"{template['power_collector_key']}-{port}"
+                device["description"] = f"{model} {unit_id}"
+                devices.append(device)
+
+        return {**self._device_tree, "lstDeviceTree": devices}
+
+    def plant_list(self) -> List[Dict]:
+        return self._plant_list
+
+    def plant_info(self, plant_no: str) -> Dict:
+        return {**self._plant_info, "PlantNo": plant_no}
+
+    def device_tree(self, plant_no: str) -> Dict:
+        return self._device_tree
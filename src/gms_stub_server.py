@@ -0,0 +1,204 @@
+"""
+Local stand-in for the AUO GMS portal, serving the fake/ fixtures
+
+Point AUOPlantProvider at it with AUO_GMS_BASE_URL, e.g.
+
+    python -m src.gms_stub_server --port 8765 --plants 1000 --devices 200
+    AUO_GMS_BASE_URL=http://127.0.0.1:8765/MvcWebPortal python main.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+from src.gms_fixtures import GmsFixtures
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_COOKIE = "ASP.NET_SessionId"
+
+
+class GmsStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        fixtures: Optional[GmsFixtures] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        session_ttl: Optional[float] = None,
+    ):
+        super().__init__(address, GmsStubHandler)
+        self.fixtures = fixtures or GmsFixtures()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        # 設定時 session 在登入後這麼多秒失效，之後的請求回覆 401
+        self.session_ttl = session_ttl
+        self.sessions: Dict[str, float] = {}
+        self.request_counts = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/MvcWebPortal"
+
+    def start(self) -> "GmsStubServer":
+        """在背景執行緒啟動伺服器"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def simulate(self, endpoint: str) -> bool:
+        """套用延遲並決定是否注入錯誤，回傳 True 表示應回覆錯誤"""
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            fail = self.random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    def new_session(self) -> str:
+        with self._lock:
+            session_id = f"stub-{len(self.sessions) + 1}"
+            self.sessions[session_id] = time.monotonic()
+        return session_id
+
+    def session_valid(self, session_id: Optional[str]) -> bool:
+        if self.session_ttl is None:
+            return True
+        with self._lock:
+            logged_in_at = self.sessions.get(session_id)
+        return (
+            logged_in_at is not None
+            and time.monotonic() - logged_in_at < self.session_ttl
+        )
+
+
+class GmsStubHandler(BaseHTTPRequestHandler):
+    server: GmsStubServer
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int = 500):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        path = urlparse(self.path).path.lower()
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+
+        if path != "/mvcwebportal/login/login3":
+            self.send_error(404)
+            return
+        if self.server.simulate("Login3"):
+            self._send_error()
+            return
+        session_id = self.server.new_session()
+        self._send_json(
+            {"result": "OK"},
+            {"Set-Cookie": f"{SESSION_COOKIE}={session_id}; Path=/; HttpOnly"},
+        )
+
+    def _session_id(self) -> Optional[str]:
+        cookie = SimpleCookie(self.headers.get("Cookie") or "")
+        morsel = cookie.get(SESSION_COOKIE)
+        return morsel.value if morsel else None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.rsplit("/", 1)[-1].lower()
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        fixtures = self.server.fixtures
+
+        routes = {
+            "getplantsreduce": lambda: fixtures.plant_list(),
+            "getoneplantinfo": lambda: fixtures.plant_info(params.get("plantNo", "")),
+            "getdevicetreedata": lambda: fixtures.device_tree(
+                params.get("plant_no", "")
+            ),
+        }
+        route = routes.get(endpoint)
+        if route is None:
+            self.send_error(404)
+            return
+        if not self.server.session_valid(self._session_id()):
+            self._send_error(401)
+            return
+        if self.server.simulate(endpoint):
+            self._send_error()
+            return
+        self._send_json(route())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AUO GMS 測試用模擬伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--plants", type=int, help="產生指定數量的合成電站")
+    parser.add_argument("--devices", type=int, help="每個電站的裝置數量")
+    parser.add_argument("--latency", type=float, default=0.0, help="每個請求的延遲（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="額外的隨機延遲上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回覆 500 的機率")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--session-ttl", type=float, help="登入後 session 的有效秒數，未設定則永不失效")
+    args = parser.parse_args()
+
+    server = GmsStubServer(
+        (args.host, args.port),
+        GmsFixtures(plants=args.plants, devices_per_plant=args.devices),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+        session_ttl=args.session_ttl,
+    )
+    print(f"Serving AUO GMS stub at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import zipfile
+from abc import ABC, abstractmethod
+from typing import Optional
+import openpyxl
+from src.basic_info_processor import BasicInfoProcessor
+from src.constants.constants import SheetNames
+from src.constants.sheet_styles import SheetStyles
+from src.device_list_processor import DeviceListProcessor
+from src.sheet_writer import open_sheet
+from src.station_renderer import StationRecord, fill_station_sheets
+
+INDEX_COLUMNS = [
+    ("電站代碼", "A"),
+    ("電站名稱", "B"),
+    ("日照計", "C"),
+    ("溫度計", "D"),
+    ("逆變器", "E"),
+    ("基本資訊分頁", "F"),
+    ("裝置列表分頁", "G"),
+]
+
+
+class OutputSink(ABC):
+    """
+    Where converted stations are written, independent of how they are rendered
+
+    A FileSink receives the finished xlsx bytes of each station through
+    write(); a RecordSink, which has consumes_records set, receives the
+    fetched StationRecord through write_record() and fills it itself. Both
+    return the location to record in the manifest. The converter calls
+    close() once after the last station, or abort() instead when the run
+    stops early, so a bundle from an earlier run is not replaced.
+    """
+
+    # 為 True 時 sink 自行填寫 StationRecord，轉換器不必先產生 xlsx
+    consumes_records = False
+    # 上次的輸出檔會留在原處，資料未變更的電站可以略過
+    keeps_outputs = False
+
+    def output_path(self, station_code: str) -> Optional[str]:
+        """keeps_outputs 時，電站的輸出檔會寫到的位置"""
+        return None
+
+    def close(self):
+        pass
+
+    def abort(self):
+        """轉換中止時呼叫，取代 close()；已寫出的單檔輸出保留在原處"""
+        pass
+
+
+class FileSink(OutputSink):
+    """A sink for stations already rendered to xlsx bytes"""
+
+    @abstractmethod
+    def write(self, station_code: str, content: bytes) -> str:
+        pass
+
+
+class RecordSink(OutputSink):
+    """A sink that fills the workbook of each StationRecord itself"""
+
+    consumes_records = True
+
+    @abstractmethod
+    def write_record(self, record: StationRecord) -> str:
+        pass
+
+
+class DirectorySink(FileSink):
+    """One {電站代碼}.xlsx per station in output_dir"""
+
+    keeps_outputs = True
+
+    def __init__(self, output_dir: str = "."):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+    def output_path(self, station_code: str) -> str:
+        return os.path.normpath(os.path.join(self.output_dir, f"{station_code}.xlsx"))
+
+    def write(self, station_code: str, content: bytes) -> str:
+        path = self.output_path(station_code)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+
+class ZipSink(FileSink):
+    """
+    All station workbooks in a single ZIP archive, written in one pass
+
+    xlsx files are already deflated, so entries are stored uncompressed.
+    The archive is written to a temporary name and moved into place on close.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp_path = f"{path}.tmp"
+        self._zip = zipfile.ZipFile(self._tmp_path, "w", zipfile.ZIP_STORED)
+
+    def write(self, station_code: str, content: bytes) -> str:
+        name = f"{station_code}.xlsx"
+        self._zip.writestr(name, content)
+        return f"{self.path}/{name}"
+
+    def close(self):
+        self._zip.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._zip.close()
+        os.remove(self._tmp_path)
+
+
+class WorkbookSink(RecordSink):
+    """
+    Every station in one workbook: an index sheet, then a basic-info and
+    device-list sheet pair per station in input order
+
+    The workbook is write-only, so each station's sheets are flushed to disk
+    as soon as they are filled and memory does not grow with the station count.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self._basic_info_processor = BasicInfoProcessor()
+
+        # 索引分頁須為第一個分頁，內容在 close 時才寫出
+        self._index = open_sheet(self.workbook, SheetNames.STATION_INDEX.value)
+        self._index.set_column_widths({"A": 15, "B": 40, "F": 20, "G": 20})
+        self._index.write_row(1, INDEX_COLUMNS, SheetStyles.BASIC_INFO_HEADER)
+        self._index_row = 2
+
+    def write_record(self, record: StationRecord) -> str:
+        station_code = record.row["電站代碼"]
+        basic_info = self._basic_info_processor.setup_basic_info_sheet(
+            self.workbook, f"{station_code} 基本資訊"
+        )
+        device_list = DeviceListProcessor(None).setup_device_list_sheet(
+            self.workbook, f"{station_code} 裝置列表"
+        )
+        fill_station_sheets(record, basic_info, device_list)
+
+        plant = record.plant
+        self._index.write_row(
+            self._index_row,
+            [
+                (station_code, "A"),
+                (record.row["電站名稱"], "B"),
+                (len(plant.pyranometers), "C"),
+                (len(plant.thermometers), "D"),
+                (len(plant.inverters), "E"),
+                (basic_info.title, "F"),
+                (device_list.title, "G"),
+            ],
+        )
+        self._index_row += 1
+        return f"{self.path}/{basic_info.title}"
+
+    def close(self):
+        self._index.close()
+        tmp_path = f"{self.path}.tmp"
+        self.workbook.save(tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def abort(self):
+        # 尚未存檔，直接捨棄，保留上次的工作簿
+        pass
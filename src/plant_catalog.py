@@ -0,0 +1,163 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    plant_no: str  # 已 unquote 的 PlantNo
+    plant_name: str
+
+
+@dataclass
+class CatalogResolution:
+    """Result of resolving every plant name of a run at once"""
+
+    plant_nos: Dict[str, str] = field(default_factory=dict)  # 多筆相符時取第一筆
+    unmatched: List[str] = field(default_factory=list)
+    ambiguous: List[str] = field(default_factory=list)  # 也列在 plant_nos 中
+
+
+class PatternMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of patterns
+
+    search() reports every pattern occurring in a text in one pass over the
+    text, however many patterns there are.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[int]] = [[]]
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._output.append([])
+                node = child
+            self._output[node].append(index)
+
+        # 以廣度優先建立失敗連結，並將失敗節點的輸出併入，查詢時不必再沿連結走
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = (
+                    self._output[child] + self._output[self._fail[child]]
+                )
+
+    def search(self, text: str) -> Set[int]:
+        """Indices of the patterns that occur in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[int] = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+
+class PlantCatalog:
+    """In-memory index over the GetPlantsReduce plant list"""
+
+    def __init__(self, entries: Iterable[CatalogEntry]):
+        self.entries: List[CatalogEntry] = list(entries)
+        self._exact: Dict[str, CatalogEntry] = {}
+        for entry in self.entries:
+            # 同名電站以目錄中第一筆為準
+            self._exact.setdefault(entry.plant_name, entry)
+        self._matches: Dict[str, Tuple[CatalogEntry, ...]] = {}
+
+    @classmethod
+    def from_response(cls, plants: List[Dict]) -> "PlantCatalog":
+        """Build a catalog from the raw GetPlantsReduce payload"""
+        return cls(
+            CatalogEntry(
+                plant_no=unquote(plant["PlantNo"]), plant_name=plant["PlantName"]
+            )
+            for plant in plants
+        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def match(self, plant_name: str) -> Tuple[CatalogEntry, ...]:
+        """Return every catalog entry matching the plant name, best match first"""
+        cached = self._matches.get(plant_name)
+        if cached is not None:
+            return cached
+
+        exact = self._exact.get(plant_name)
+        if exact is not None:
+            matches: Tuple[CatalogEntry, ...] = (exact,)
+        else:
+            matches = tuple(
+                entry for entry in self.entries if plant_name in entry.plant_name
+            )
+        self._matches[plant_name] = matches
+        return matches
+
+    def resolve_all(self, plant_names: Iterable[str]) -> CatalogResolution:
+        """
+        Match every plant name against the catalog in a single pass
+
+        Names without an exact entry are matched as substrings of the
+        catalog names with one PatternMatcher, so the cost grows with the
+        total length of the names instead of names x catalog entries. The
+        matches are cached, so later lookup() calls do not search again.
+        """
+        names = list(dict.fromkeys(name for name in plant_names if name))
+        pending = [
+            name
+            for name in names
+            if name not in self._matches and name not in self._exact
+        ]
+        if pending:
+            found: List[List[CatalogEntry]] = [[] for _ in pending]
+            matcher = PatternMatcher(pending)
+            for entry in self.entries:
+                for index in matcher.search(entry.plant_name):
+                    found[index].append(entry)
+            for name, entries in zip(pending, found):
+                self._matches[name] = tuple(entries)
+
+        resolution = CatalogResolution()
+        for name in names:
+            matches = self.match(name)
+            if not matches:
+                resolution.unmatched.append(name)
+                continue
+            resolution.plant_nos[name] = matches[0].plant_no
+            if len(matches) > 1:
+                resolution.ambiguous.append(name)
+        return resolution
+
+    def lookup(self, plant_name: str) -> Optional[str]:
+        """Resolve a plant name to its PlantNo, warning on ambiguous matches"""
+        matches = self.match(plant_name)
+        if not matches:
+            return None
+        if len(matches) > 1:
+            candidates = ", ".join(entry.plant_name for entry in matches)
+            logger.warning(
+                f"Ambiguous plant name '{plant_name}' matches {len(matches)} plants "
+                f"({candidates}), using '{matches[0].plant_name}'"
+            )
+        return matches[0].plant_no
@@ -1,24 +1,61 @@
 from abc import ABC, abstractmethod
-from typing import List
-from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+from dataclasses import dataclass, field
+from src.device_table import Device, DeviceTable, DeviceView
+from src.plant_catalog import CatalogResolution
 
-
-@dataclass
-class Device:
-    device_name: str
-    device_serial_number: str  # 裝置序號
-    device_id: str  # 裝置代碼
+PYRANOMETERS = "pyranometers"
+THERMOMETERS = "thermometers"
+INVERTERS = "inverters"
 
 
 @dataclass
 class Plant:
     grid_connection_date: str
-    pyranometers: List[Device]
-    thermometers: List[Device]
-    inverters: List[Device]
+    devices: DeviceTable = field(default_factory=DeviceTable)
+
+    @property
+    def pyranometers(self) -> DeviceView:
+        return self.devices.group(PYRANOMETERS)
+
+    @property
+    def thermometers(self) -> DeviceView:
+        return self.devices.group(THERMOMETERS)
+
+    @property
+    def inverters(self) -> DeviceView:
+        return self.devices.group(INVERTERS)
+
+    def to_dict(self) -> Dict:
+        """與改用 DeviceTable 前 dataclasses.asdict(plant) 的結構相同"""
+        devices = self.devices.to_dict()
+        return {
+            "grid_connection_date": self.grid_connection_date,
+            **{
+                group: devices.get(group, [])
+                for group in (PYRANOMETERS, THERMOMETERS, INVERTERS)
+            },
+        }
 
 
 class PlantProvider(ABC):
     @abstractmethod
     def fetch_plant(self, station_code: str) -> Plant:
         pass
+
+    def resolve_plants(self, plant_names: Iterable[str]) -> Optional[CatalogResolution]:
+        """
+        Resolve the plant names of a whole run before fetching any plant
+
+        Returns None when the provider cannot tell in advance, e.g. when its
+        catalog is unavailable.
+        """
+        return None
+
+    def report(self):
+        """Log provider statistics at the end of a run"""
+        pass
+
+    def close(self):
+        """Release caches and connections at the end of a run"""
+        pass
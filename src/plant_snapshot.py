@@ -0,0 +1,283 @@
+"""
+Columnar snapshots of fetched plants, for re-rendering without AUO
+
+A run started with --snapshot DIR also writes every fetched plant to
+Parquet, partitioned by run date:
+
+    DIR/plants/run_date=2026-10-18/<snapshot id>.parquet
+    DIR/devices/run_date=2026-10-18/<snapshot id>.parquet
+
+plants has one row per fetched station, devices one row per device in tree
+order, linked by (snapshot_id, plant_id). Every run and shard writes its own
+snapshot id, so they never overwrite each other; loading a date keeps the
+most recently fetched plant of each station. Requires pyarrow.
+"""
+import os
+import socket
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from src.device_table import DeviceTable
+from src.plant_provider import Plant, PlantProvider
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+
+PLANTS = "plants"
+DEVICES = "devices"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Plant snapshots need pyarrow: pip install pyarrow")
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    return {
+        PLANTS: pa.schema(
+            [
+                ("snapshot_id", pa.string()),
+                ("plant_id", pa.int32()),
+                ("station_code", pa.string()),
+                ("plant_name", pa.string()),
+                ("grid_connection_date", pa.string()),
+                # 含沒有裝置的類別，載入後的 DeviceTable 與原本相同
+                ("device_groups", pa.list_(pa.string())),
+                ("fetched_at", pa.timestamp("ms")),
+            ]
+        ),
+        DEVICES: pa.schema(
+            [
+                ("snapshot_id", pa.string()),
+                ("plant_id", pa.int32()),
+                ("device_group", pa.string()),
+                ("position", pa.int32()),
+                ("name", pa.string()),
+                ("serial_number", pa.string()),
+                ("device_id", pa.string()),
+            ]
+        ),
+    }
+
+
+def _partition(root: Path, table: str, run_date: str) -> Path:
+    return root / table / f"run_date={run_date}"
+
+
+def latest_run_date(root: str = "snapshots") -> Optional[str]:
+    dates = [
+        path.name.split("=", 1)[1]
+        for path in (Path(root) / PLANTS).glob("run_date=*")
+        if path.is_dir()
+    ]
+    return max(dates, default=None)
+
+
+def _run_starts(table: "pa.Table", columns: List[str]) -> "pa.Array":
+    """Row indices where any of the columns differs from the previous row"""
+    count = len(table)
+    if count == 0:
+        return pa.array([], pa.int64())
+    changed = None
+    for name in columns:
+        column = table.column(name)
+        differs = pc.not_equal(column.slice(1), column.slice(0, count - 1))
+        changed = differs if changed is None else pc.or_(changed, differs)
+    return pa.concat_arrays(
+        [pa.array([0], pa.int64()), pc.add(pc.indices_nonzero(changed), 1)]
+    )
+
+
+class PlantSnapshotWriter:
+    """
+    Collects fetched plants and writes them as Parquet row groups
+
+    add() is thread-safe. Columns are buffered for `batch_size` plants at a
+    time, so memory stays flat however many stations a run has. Files are
+    written under a hidden temporary name and moved into place on close().
+    """
+
+    def __init__(
+        self,
+        root: str = "snapshots",
+        run_date: Optional[str] = None,
+        batch_size: int = 500,
+    ):
+        _require_pyarrow()
+        self.root = Path(root)
+        self.run_date = run_date or date.today().isoformat()
+        self.snapshot_id = (
+            f"{socket.gethostname()}-{datetime.now():%H%M%S}-{os.getpid()}"
+        )
+        self.batch_size = batch_size
+        self.count = 0
+        self._schemas = _schemas()
+        self._columns = self._empty_columns()
+        self._pending = 0
+        self._writers: Dict[str, Tuple["pq.ParquetWriter", Path, Path]] = {}
+        self._lock = threading.Lock()
+
+    def _empty_columns(self) -> Dict[str, Dict[str, List]]:
+        return {
+            table: {name: [] for name in schema.names}
+            for table, schema in self._schemas.items()
+        }
+
+    def add(self, station_code: str, plant_name: str, plant: Plant):
+        with self._lock:
+            plant_id = self.count
+            plants = self._columns[PLANTS]
+            plants["snapshot_id"].append(self.snapshot_id)
+            plants["plant_id"].append(plant_id)
+            plants["station_code"].append(station_code)
+            plants["plant_name"].append(plant_name)
+            plants["grid_connection_date"].append(plant.grid_connection_date)
+            plants["device_groups"].append(list(plant.devices.groups()))
+            plants["fetched_at"].append(datetime.now())
+
+            devices = self._columns[DEVICES]
+            for group in plant.devices.groups():
+                names, serial_numbers, ids = plant.devices.group(group).columns()
+                count = len(ids)
+                devices["snapshot_id"].extend([self.snapshot_id] * count)
+                devices["plant_id"].extend([plant_id] * count)
+                devices["device_group"].extend([group] * count)
+                devices["position"].extend(range(count))
+                devices["name"].extend(names)
+                devices["serial_number"].extend(serial_numbers)
+                devices["device_id"].extend(ids)
+
+            self.count += 1
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        for table, columns in self._columns.items():
+            schema = self._schemas[table]
+            if table not in self._writers:
+                directory = _partition(self.root, table, self.run_date)
+                directory.mkdir(parents=True, exist_ok=True)
+                path = directory / f"{self.snapshot_id}.parquet"
+                # 以 . 開頭的檔案不會被當成資料集的一部分讀取
+                tmp_path = directory / f".{self.snapshot_id}.parquet.tmp"
+                self._writers[table] = (
+                    pq.ParquetWriter(tmp_path, schema),
+                    tmp_path,
+                    path,
+                )
+            writer = self._writers[table][0]
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+        self._columns = self._empty_columns()
+        self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if self._pending:
+                self._flush()
+            for writer, tmp_path, path in self._writers.values():
+                writer.close()
+                os.replace(tmp_path, path)
+            self._writers = {}
+
+
+class PlantSnapshot:
+    """The plants of one run date, keyed by station code and by plant name"""
+
+    def __init__(self, run_date: str, plants: Dict[str, Plant], names: Dict[str, str]):
+        self.run_date = run_date
+        self.plants = plants
+        self._station_codes = names  # 電站名稱 -> 電站代碼
+
+    def __len__(self) -> int:
+        return len(self.plants)
+
+    def plant(self, station_code: str) -> Optional[Plant]:
+        return self.plants.get(station_code)
+
+    def plant_by_name(self, plant_name: str) -> Optional[Plant]:
+        station_code = self._station_codes.get(plant_name)
+        return self.plants.get(station_code) if station_code is not None else None
+
+    @classmethod
+    def load(
+        cls, root: str = "snapshots", run_date: Optional[str] = None
+    ) -> "PlantSnapshot":
+        """Load one run date, the most recent one when run_date is None"""
+        _require_pyarrow()
+        run_date = run_date or latest_run_date(root)
+        if run_date is None:
+            raise FileNotFoundError(f"No plant snapshots under {root}")
+        if not _partition(Path(root), PLANTS, run_date).is_dir():
+            raise FileNotFoundError(f"No plant snapshot of {run_date} under {root}")
+
+        plants = pq.read_table(_partition(Path(root), PLANTS, run_date))
+        latest: Dict[str, Tuple[datetime, Tuple[str, int], Dict]] = {}
+        for row in plants.select(
+            [
+                "snapshot_id",
+                "plant_id",
+                "station_code",
+                "plant_name",
+                "grid_connection_date",
+                "device_groups",
+                "fetched_at",
+            ]
+        ).to_pylist():
+            current = latest.get(row["station_code"])
+            if current is None or row["fetched_at"] >= current[0]:
+                key = (row["snapshot_id"], row["plant_id"])
+                latest[row["station_code"]] = (row["fetched_at"], key, row)
+
+        wanted = {key: code for code, (_, key, _) in latest.items()}
+        columns: Dict[str, Dict[str, Tuple[List, List, List]]] = {}
+        devices = pq.read_table(_partition(Path(root), DEVICES, run_date))
+        # 裝置依電站、類別連續寫入，只需找出每段的起點，不必逐列轉成 Python 物件
+        key_columns = ["snapshot_id", "plant_id", "device_group"]
+        starts = _run_starts(devices, key_columns).to_pylist()
+        keys = devices.select(key_columns).take(starts).to_pylist()
+        device_names, serial_numbers, ids = (
+            devices.column(column).to_pylist()
+            for column in ("name", "serial_number", "device_id")
+        )
+        for start, stop, key in zip(starts, starts[1:] + [len(devices)], keys):
+            station_code = wanted.get((key["snapshot_id"], key["plant_id"]))
+            if station_code is not None:
+                columns.setdefault(station_code, {})[key["device_group"]] = (
+                    device_names[start:stop],
+                    serial_numbers[start:stop],
+                    ids[start:stop],
+                )
+
+        result: Dict[str, Plant] = {}
+        station_codes: Dict[str, str] = {}
+        for station_code, (_, _, row) in latest.items():
+            groups = columns.get(station_code, {})
+            table = DeviceTable()
+            for group in row["device_groups"]:
+                table.add_group(group, *groups.get(group, ([], [], [])))
+            result[station_code] = Plant(
+                grid_connection_date=row["grid_connection_date"], devices=table
+            )
+            station_codes[row["plant_name"]] = station_code
+        return cls(run_date, result, station_codes)
+
+
+class SnapshotPlantProvider(PlantProvider):
+    """Serves plants from a snapshot, without any network access"""
+
+    def __init__(self, root: str = "snapshots", run_date: Optional[str] = None):
+        self.snapshot = PlantSnapshot.load(root, run_date)
+
+    def fetch_plant(self, plant_name: str) -> Plant:
+        plant = self.snapshot.plant_by_name(plant_name)
+        if plant is None:
+            raise Exception(
+                f"Plant not found in snapshot {self.snapshot.run_date}: {plant_name}"
+            )
+        return plant
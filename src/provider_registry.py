@@ -0,0 +1,87 @@
+"""
+Plant providers by name, constructed only when selected
+
+Built-in providers are lazy factories in PROVIDERS, so their modules (and
+requests, for AUO) are imported only when chosen. Other packages can add
+providers under the "power_station_converter.providers" entry point group;
+each entry point must load a callable taking `offline` and returning a
+PlantProvider, e.g. in their pyproject.toml:
+
+    [project.entry-points."power_station_converter.providers"]
+    XXX = "xxx_provider:create_provider"
+
+Built-in factories also take the snapshot options from the command line;
+entry point factories are only ever called with `offline`.
+"""
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from src.plant_provider import PlantProvider
+
+ENTRY_POINT_GROUP = "power_station_converter.providers"
+
+ProviderFactory = Callable[..., "PlantProvider"]
+
+
+def _auo(offline: bool = False, **_) -> "PlantProvider":
+    from src.auo_plant_provider import AUOPlantProvider
+
+    return AUOPlantProvider(offline=offline)
+
+
+def _fake(offline: bool = False, **_) -> "PlantProvider":
+    from src.fixture_plant_provider import FixturePlantProvider
+
+    return FixturePlantProvider()
+
+
+def _snapshot(
+    offline: bool = False,
+    snapshot_dir: Optional[str] = None,
+    snapshot_date: Optional[str] = None,
+) -> "PlantProvider":
+    from src.plant_snapshot import SnapshotPlantProvider
+
+    return SnapshotPlantProvider(snapshot_dir or "snapshots", snapshot_date)
+
+
+PROVIDERS: Dict[str, ProviderFactory] = {
+    "AUO": _auo,
+    "FAKE": _fake,  # 使用 fake/ 內的範例資料
+    "SNAPSHOT": _snapshot,  # 先前以 --snapshot 存下的電站資料
+}
+
+
+def _entry_points():
+    from importlib.metadata import entry_points
+
+    eps = entry_points()
+    # Python 3.10 起改為 select()，3.9 回傳以群組為鍵的 dict
+    if hasattr(eps, "select"):
+        return eps.select(group=ENTRY_POINT_GROUP)
+    return eps.get(ENTRY_POINT_GROUP, [])
+
+
+def available_providers() -> List[str]:
+    return sorted(set(PROVIDERS) | {ep.name for ep in _entry_points()})
+
+
+def create_provider(
+    name: str,
+    offline: bool = False,
+    snapshot_dir: Optional[str] = None,
+    snapshot_date: Optional[str] = None,
+) -> "PlantProvider":
+    """只建立指定的 provider，內建名稱優先於 entry point"""
+    factory = PROVIDERS.get(name)
+    if factory is not None:
+        return factory(
+            offline=offline, snapshot_dir=snapshot_dir, snapshot_date=snapshot_date
+        )
+    for ep in _entry_points():
+        if ep.name == name:
+            # entry point 的介面只約定 offline
+            return ep.load()(offline=offline)
+    raise ValueError(
+        f"Unknown provider {name!r}, " f"available: {', '.join(available_providers())}"
+    )
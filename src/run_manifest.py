@@ -0,0 +1,147 @@
+import dataclasses
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional
+from src.station_reader import StationRow
+from src.utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from src.station_renderer import StationRecord
+
+logger = get_logger(__name__)
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+
+def _digest(data) -> str:
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def hash_row(row: StationRow) -> str:
+    return _digest(row.to_dict())
+
+
+def hash_record(record: "StationRecord") -> str:
+    """
+    Hash of everything fetched for a station besides its CSV row
+
+    Covers the coordinates too, so a workbook written while geocoding failed
+    is regenerated once the address resolves.
+    """
+    return _digest({"plant": record.plant.to_dict(), "coordinates": record.coordinates})
+
+
+@dataclass
+class ManifestEntry:
+    station_code: str
+    status: str
+    input_hash: str
+    plant_hash: Optional[str] = None  # hash_record()，含經緯度
+    output: Optional[str] = None
+    error: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class RunManifest:
+    """
+    JSON-lines record of every station's last result, kept next to the outputs
+
+    Each line is one ManifestEntry; when a station appears more than once the
+    last line wins, so results can be appended as soon as they are known.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, ManifestEntry] = {}
+        # manifest 放在輸出目錄內，合併分片時目錄可能尚未建立
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        line_count = self._load()
+        if line_count > 2 * len(self.entries):
+            self._compact()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+
+        line_count = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                line_count += 1
+                try:
+                    entry = ManifestEntry(**json.loads(line))
+                except (ValueError, TypeError):
+                    # 中斷時可能留下寫到一半的最後一行
+                    logger.warning(f"Ignoring malformed manifest line in {self.path}")
+                    continue
+                self.entries[entry.station_code] = entry
+        return line_count
+
+    def _compact(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(
+                    json.dumps(dataclasses.asdict(entry), ensure_ascii=False) + "\n"
+                )
+        os.replace(tmp_path, self.path)
+
+    def __iter__(self) -> Iterator[ManifestEntry]:
+        return iter(self.entries.values())
+
+    def get(self, station_code: str) -> Optional[ManifestEntry]:
+        return self.entries.get(station_code)
+
+    def is_done(self, station_code: str, input_hash: str, output: str) -> bool:
+        """輸入未變更、上次成功，且輸出檔就是這次要寫的 output 並仍存在"""
+        entry = self.entries.get(station_code)
+        return (
+            entry is not None
+            and entry.status == STATUS_OK
+            and entry.input_hash == input_hash
+            and entry.output == output
+            and os.path.exists(output)
+        )
+
+    def is_unchanged(
+        self, station_code: str, input_hash: str, plant_hash: str, output: str
+    ) -> bool:
+        """輸入與擷取到的電站資料皆與上次成功時相同"""
+        return (
+            self.is_done(station_code, input_hash, output)
+            and self.entries[station_code].plant_hash == plant_hash
+        )
+
+    def record(self, entry: ManifestEntry):
+        entry.updated_at = datetime.now().isoformat(timespec="seconds")
+        self.entries[entry.station_code] = entry
+        self._file.write(
+            json.dumps(dataclasses.asdict(entry), ensure_ascii=False) + "\n"
+        )
+        self._file.flush()
+
+    def merge(self, entries: Iterable[ManifestEntry]):
+        """
+        Take over results from another manifest, e.g. a shard's, keeping the
+        more recent entry per station, and rewrite the file compacted
+        """
+        for entry in entries:
+            current = self.entries.get(entry.station_code)
+            if current is None or (entry.updated_at or "") >= (
+                current.updated_at or ""
+            ):
+                self.entries[entry.station_code] = entry
+        self._file.close()
+        self._compact()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self._file.close()
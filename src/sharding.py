@@ -0,0 +1,148 @@
+"""
+Split one conversion job into K shards by hash of 電站代碼
+
+Every shard reads the whole CSV and keeps only its own stations, so shards
+need no coordination: run them as local processes (main.py --shards K) or
+on separate machines sharing a filesystem (main.py --shard I/K on each).
+A shard writes its own manifest and run report next to the usual paths,
+e.g. manifest.shard-2-of-8.jsonl; merge_shards() combines them afterwards.
+"""
+import hashlib
+import json
+import os
+import socket
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+from src.run_manifest import STATUS_FAILED, RunManifest
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+REPORT_PATH = "run_report.json"
+
+
+class Shard(NamedTuple):
+    index: int  # 1 起算
+    count: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Shard":
+        """Parse "I/K", e.g. "2/8" for the second of eight shards"""
+        try:
+            index, count = (int(part) for part in value.split("/"))
+        except ValueError:
+            raise ValueError(f"Invalid shard {value!r}, expected I/K") from None
+        if not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {value!r}, need 1 <= I <= K")
+        return cls(index, count)
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def contains(self, station_code: Optional[str]) -> bool:
+        return shard_of(station_code or "", self.count) == self.index
+
+    def path(self, path: str) -> str:
+        """在副檔名前加上分片編號，例如 manifest.jsonl -> manifest.shard-2-of-8.jsonl"""
+        root, ext = os.path.splitext(path)
+        return f"{root}.shard-{self.index}-of-{self.count}{ext}"
+
+
+def shard_of(station_code: str, count: int) -> int:
+    """
+    Shard (1..count) a station belongs to
+
+    Uses sha256 rather than hash(), which is salted per process, so every
+    process and machine agrees on the split.
+    """
+    digest = hashlib.sha256(station_code.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def write_shard_report(
+    shard: Shard, summary: Counter, started_at: float, report_path: str = REPORT_PATH
+):
+    finished_at = time.time()
+    report = {
+        "shard": str(shard),
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "started_at": datetime.fromtimestamp(started_at).isoformat(timespec="seconds"),
+        "finished_at": datetime.fromtimestamp(finished_at).isoformat(
+            timespec="seconds"
+        ),
+        "elapsed_s": round(finished_at - started_at, 3),
+        "summary": dict(summary),
+    }
+    path = shard.path(report_path)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def merge_shards(
+    count: int,
+    manifest_path: str = "manifest.jsonl",
+    report_path: str = REPORT_PATH,
+) -> Dict:
+    """
+    Merge the manifests and reports of shards 1..count into manifest_path
+    and report_path
+
+    Existing entries in manifest_path are kept unless a shard has a newer
+    result for the same station, so the merged manifest also works with a
+    later unsharded --resume. Missing shards are listed in the report.
+    """
+    shards = [Shard(index, count) for index in range(1, count + 1)]
+    reports: List[Dict] = []
+    missing: List[str] = []
+
+    manifest = RunManifest(manifest_path)
+    try:
+        for shard in shards:
+            shard_manifest = shard.path(manifest_path)
+            if not os.path.exists(shard_manifest):
+                missing.append(str(shard))
+                continue
+            part = RunManifest(shard_manifest)
+            part.close()
+            manifest.merge(part)
+
+            shard_report = shard.path(report_path)
+            if os.path.exists(shard_report):
+                with open(shard_report, encoding="utf-8") as f:
+                    reports.append(json.load(f))
+    finally:
+        manifest.close()
+
+    summary = Counter()
+    for report in reports:
+        summary.update(report["summary"])
+    failed = [
+        {"station_code": entry.station_code, "error": entry.error}
+        for entry in manifest
+        if entry.status == STATUS_FAILED
+    ]
+    run_report = {
+        "shards": count,
+        "missing_shards": missing,
+        "summary": dict(summary),
+        "stations": dict(Counter(entry.status for entry in manifest)),
+        "failed": failed,
+        # 各分片同時執行，整體耗時以最慢的分片為準
+        "elapsed_s": max((report["elapsed_s"] for report in reports), default=0.0),
+        "shard_reports": reports,
+    }
+    with open(f"{report_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(run_report, f, ensure_ascii=False, indent=2)
+    os.replace(f"{report_path}.tmp", report_path)
+
+    if missing:
+        logger.warning(f"Shards without a manifest: {', '.join(missing)}")
+    logger.info(
+        f"Merged {count - len(missing)}/{count} shards into {manifest_path}: "
+        + ", ".join(f"{n} {status}" for status, n in summary.items())
+    )
+    return run_report
@@ -0,0 +1,210 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils import column_index_from_string
+from openpyxl.workbook.workbook import Workbook
+from openpyxl.worksheet.worksheet import Worksheet
+from src.constants.sheet_styles import CellStyle
+
+# (值, 欄位字母)，與 SheetHeaders / SheetExamples 的格式相同
+RowCells = Iterable[Tuple[Any, str]]
+# (整欄的值, 欄位字母)，第 i 個值寫入 first_row + i 列
+ColumnCells = Sequence[Tuple[Sequence[Any], str]]
+
+
+class RowTemplate:
+    """A static row resolved once: column indices, bound values and style"""
+
+    __slots__ = ("cells", "style")
+
+    def __init__(self, cells: RowCells, style: Optional[CellStyle] = None):
+        resolved = []
+        for value, col in cells:
+            # 僅用於靜態文字，預先完成型別判斷與字串檢查
+            probe = Cell(None, value=value)
+            resolved.append(
+                (column_index_from_string(col), probe._value, probe.data_type)
+            )
+        self.cells: Tuple[Tuple[int, Any, str], ...] = tuple(resolved)
+        self.style = style
+
+
+class StyleRegistry:
+    """Registers each CellStyle with a workbook once and reuses its style array"""
+
+    def __init__(self, workbook: Workbook):
+        self.workbook = workbook
+        self._arrays: Dict[CellStyle, StyleArray] = {}
+
+    def get(self, style: CellStyle) -> StyleArray:
+        array = self._arrays.get(style)
+        if array is None:
+            array = StyleArray()
+            array.fontId = self.workbook._fonts.add(style.font)
+            array.fillId = self.workbook._fills.add(style.fill)
+            self._arrays[style] = array
+        return array
+
+
+def get_style_registry(workbook: Workbook) -> StyleRegistry:
+    registry = getattr(workbook, "_style_registry", None)
+    if registry is None:
+        registry = StyleRegistry(workbook)
+        workbook._style_registry = registry
+    return registry
+
+
+class SheetWriter:
+    """Writes whole rows of values into a regular worksheet"""
+
+    def __init__(self, sheet: Worksheet):
+        self.sheet = sheet
+        self.styles = get_style_registry(sheet.parent)
+
+    @property
+    def title(self) -> str:
+        return self.sheet.title
+
+    def set_column_widths(self, widths: Dict[str, float]):
+        for col, width in widths.items():
+            self.sheet.column_dimensions[col].width = width
+
+    def set_default_column_width(self, width: float):
+        self.sheet.sheet_format.defaultColWidth = width
+
+    def write_row(self, row: int, cells: RowCells, style: Optional[CellStyle] = None):
+        style_array = self.styles.get(style) if style is not None else None
+        sheet_cells = self.sheet._cells
+        for value, col in cells:
+            column = column_index_from_string(col)
+            sheet_cells[(row, column)] = Cell(
+                self.sheet, row=row, column=column, value=value, style_array=style_array
+            )
+
+    def write_template(self, row: int, template: RowTemplate):
+        style_array = self.styles.get(template.style) if template.style else None
+        sheet_cells = self.sheet._cells
+        for column, value, data_type in template.cells:
+            cell = Cell(self.sheet, row=row, column=column, style_array=style_array)
+            cell._value = value
+            cell.data_type = data_type
+            sheet_cells[(row, column)] = cell
+
+    def write_columns(
+        self,
+        first_row: int,
+        columns: ColumnCells,
+        template: Optional[RowTemplate] = None,
+    ) -> range:
+        """
+        Write a block of rows column by column, starting at first_row
+
+        Every column must have the same length. Cells of template, if given,
+        are repeated on every row of the block. Returns the rows written.
+        """
+        rows = _block_rows(first_row, columns)
+        sheet, sheet_cells = self.sheet, self.sheet._cells
+        for values, col in columns:
+            column = column_index_from_string(col)
+            if isinstance(values, range):
+                # 連續編號一定是整數，不需逐一判斷型別
+                for row, value in zip(rows, values):
+                    cell = Cell(sheet, row=row, column=column)
+                    cell._value = value
+                    cell.data_type = "n"
+                    sheet_cells[(row, column)] = cell
+                continue
+            for row, value in zip(rows, values):
+                sheet_cells[(row, column)] = Cell(
+                    sheet, row=row, column=column, value=value
+                )
+        if template is not None:
+            style_array = self.styles.get(template.style) if template.style else None
+            for column, value, data_type in template.cells:
+                for row in rows:
+                    cell = Cell(sheet, row=row, column=column, style_array=style_array)
+                    cell._value = value
+                    cell.data_type = data_type
+                    sheet_cells[(row, column)] = cell
+        return rows
+
+    def close(self):
+        pass
+
+
+class StreamingSheetWriter(SheetWriter):
+    """Buffers rows as plain tuples and streams them into a write-only worksheet"""
+
+    def __init__(self, sheet):
+        super().__init__(sheet)
+        self._rows: Dict[int, Dict[int, Tuple[Any, Optional[StyleArray]]]] = {}
+
+    def write_row(self, row: int, cells: RowCells, style: Optional[CellStyle] = None):
+        style_array = self.styles.get(style) if style is not None else None
+        buffered = self._rows.setdefault(row, {})
+        for value, col in cells:
+            buffered[column_index_from_string(col)] = (value, style_array)
+
+    def write_template(self, row: int, template: RowTemplate):
+        style_array = self.styles.get(template.style) if template.style else None
+        buffered = self._rows.setdefault(row, {})
+        for column, value, _ in template.cells:
+            buffered[column] = (value, style_array)
+
+    def write_columns(
+        self,
+        first_row: int,
+        columns: ColumnCells,
+        template: Optional[RowTemplate] = None,
+    ) -> range:
+        rows = _block_rows(first_row, columns)
+        style_array = None
+        if template is not None and template.style:
+            style_array = self.styles.get(template.style)
+        fixed = (
+            {column: (value, style_array) for column, value, _ in template.cells}
+            if template is not None
+            else {}
+        )
+        indices = [column_index_from_string(col) for _, col in columns]
+        for row, values in zip(rows, zip(*(values for values, _ in columns))):
+            buffered = self._rows.setdefault(row, {})
+            buffered.update(fixed)
+            buffered.update(zip(indices, ((value, None) for value in values)))
+        return rows
+
+    def close(self):
+        """依列順序寫出所有緩衝的列，關閉後不可再寫入"""
+        last_row = max(self._rows, default=0)
+        for row in range(1, last_row + 1):
+            self.sheet.append(self._build_row(self._rows.pop(row, {})))
+        # 立即完成分頁的暫存檔，同一工作簿有大量分頁時不會一直佔用檔案代號
+        self.sheet.close()
+
+    def _build_row(self, buffered: Dict[int, Tuple[Any, Optional[StyleArray]]]) -> List:
+        values: List = [None] * max(buffered, default=0)
+        for column, (value, style_array) in buffered.items():
+            if style_array is None:
+                values[column - 1] = value
+            else:
+                cell = WriteOnlyCell(self.sheet, value)
+                cell._style = StyleArray(style_array)
+                values[column - 1] = cell
+        return values
+
+
+def _block_rows(first_row: int, columns: ColumnCells) -> range:
+    lengths = {len(values) for values, _ in columns}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns of one block differ in length: {sorted(lengths)}")
+    return range(first_row, first_row + lengths.pop() if lengths else first_row)
+
+
+def open_sheet(workbook: Workbook, title: str) -> SheetWriter:
+    """取得或建立指定名稱的分頁，並依工作簿模式回傳對應的 writer"""
+    if workbook.write_only:
+        return StreamingSheetWriter(workbook.create_sheet(title))
+
+    if title in workbook.sheetnames:
+        return SheetWriter(workbook[title])
+    return SheetWriter(workbook.create_sheet(title))
@@ -0,0 +1,106 @@
+import csv
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+# 欄位名稱與 StationRow 屬性的對應
+COLUMNS = {
+    "電站代碼": "station_code",
+    "電站名稱": "station_name",
+    "地區": "region",
+    "CITY": "city",
+    "地址": "address",
+    "註冊碼": "registration_code",
+    "假MAC": "fake_mac",
+}
+
+REQUIRED_COLUMNS = tuple(COLUMNS)
+
+
+class StationRow:
+    """One input station; supports row["電站代碼"] access like a dict"""
+
+    __slots__ = tuple(COLUMNS.values())
+
+    def __init__(self, values: List[Optional[str]]):
+        for attr, value in zip(self.__slots__, values):
+            setattr(self, attr, value)
+
+    def __getitem__(self, column: str) -> Optional[str]:
+        try:
+            return getattr(self, COLUMNS[column])
+        except KeyError:
+            raise KeyError(column) from None
+
+    def to_dict(self) -> dict:
+        return {column: getattr(self, attr) for column, attr in COLUMNS.items()}
+
+    def __getstate__(self):
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+    def __setstate__(self, state):
+        for attr, value in zip(self.__slots__, state):
+            setattr(self, attr, value)
+
+    def __repr__(self) -> str:
+        return f"StationRow({self.to_dict()!r})"
+
+
+def read_station_rows(input_file: str) -> Iterator[StationRow]:
+    """
+    逐列讀取電站 CSV，開檔時即檢查必要欄位
+    只保留必要欄位，空白欄位轉為 None
+    """
+    f = open(input_file, newline="", encoding="utf-8-sig")
+    try:
+        reader = csv.reader(f)
+        header = [column.strip() for column in next(reader, [])]
+        missing = [column for column in REQUIRED_COLUMNS if column not in header]
+        if missing:
+            raise ValueError(
+                f"Missing required columns in {input_file}: {', '.join(missing)}"
+            )
+        indices = [header.index(column) for column in REQUIRED_COLUMNS]
+    except Exception:
+        f.close()
+        raise
+
+    return _iter_rows(f, reader, indices)
+
+
+def _iter_rows(f: TextIO, reader, indices: List[int]) -> Iterator[StationRow]:
+    with f:
+        for record in reader:
+            if not any(record):
+                continue
+            values = []
+            for index in indices:
+                value = record[index].strip() if index < len(record) else ""
+                values.append(value or None)
+            yield StationRow(values)
+
+
+def validate_station_rows(input_file: str) -> Tuple[int, List[str]]:
+    """
+    Check a station CSV without fetching or writing anything
+
+    Returns the number of stations and a list of problems: rows without a
+    電站代碼 or 電站名稱, and duplicate 電站代碼. A missing required column
+    raises ValueError as in read_station_rows.
+    """
+    problems: List[str] = []
+    seen = {}
+    count = 0
+    for count, row in enumerate(read_station_rows(input_file), 1):
+        station_code = row["電站代碼"]
+        for column in ("電站代碼", "電站名稱"):
+            if row[column] is None:
+                problems.append(f"Station #{count}: missing {column}")
+        if station_code is None:
+            continue
+        if station_code in seen:
+            problems.append(
+                f"Station #{count}: duplicate 電站代碼 {station_code} "
+                f"(first at #{seen[station_code]})"
+            )
+        else:
+            seen[station_code] = count
+    return count, problems
@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+from openpyxl.workbook.workbook import Workbook
+from src.basic_info_processor import BasicInfoProcessor
+from src.device_list_processor import DeviceListProcessor
+from src.geocode_cache import Coordinates
+from src.plant_provider import Plant
+from src.sheet_writer import SheetWriter
+from src.station_reader import StationRow
+from src.utils.metrics import metrics
+from src.workbook_template import get_workbook_template
+
+# 經緯度已在擷取階段取得，產生工作簿時不會呼叫任何外部 API
+_basic_info_processor = BasicInfoProcessor()
+
+
+@dataclass
+class StationRecord:
+    """Everything fetched for one station, ready to be rendered"""
+
+    row: StationRow
+    plant: Plant
+    coordinates: Coordinates
+
+
+def fill_station_sheets(
+    record: StationRecord, basic_info: SheetWriter, device_list: SheetWriter
+):
+    """將電站資料填入已設定好格式的兩個分頁，填完即關閉"""
+    with metrics.span("fill_basic_info"):
+        _basic_info_processor.fill_station_info(
+            basic_info, record.row, record.coordinates
+        )
+        basic_info.close()
+
+    with metrics.span("fill_device_list"):
+        device_list_processor = DeviceListProcessor(record.plant)
+        device_list_processor.fill_logger(device_list, record.row)
+        device_list_processor.fill_pyranometer(device_list)
+        device_list_processor.fill_thermometer(device_list)
+        device_list_processor.fill_unused_device(device_list)
+        device_list_processor.fill_inverter(device_list)
+        device_list.close()
+
+
+def build_station_workbook(record: StationRecord, write_only: bool = False) -> Workbook:
+    """填入單一電站的所有分頁，尚未存檔"""
+    station = get_workbook_template().new_workbook(write_only)
+    fill_station_sheets(record, station.basic_info, station.device_list)
+    return station.workbook
+
+
+def render_station(record: StationRecord, write_only: bool = False) -> bytes:
+    """
+    產生單一電站的工作簿並回傳 xlsx 內容
+    只依賴傳入的資料，可在其他行程中執行
+    """
+    buffer = BytesIO()
+    workbook = build_station_workbook(record, write_only)
+    with metrics.span("save"):
+        workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def render_station_in_worker(
+    record: StationRecord, write_only: bool = False, collect_metrics: bool = False
+) -> Tuple[bytes, Optional[Dict]]:
+    """
+    供行程池使用的 render_station，子行程的計時結果隨內容一併傳回主行程
+    """
+    if not collect_metrics:
+        return render_station(record, write_only), None
+
+    metrics.enable()
+    metrics.reset()
+    with metrics.station(record.row["電站代碼"]), metrics.span("render"):
+        content = render_station(record, write_only)
+    return content, metrics.export_state()
@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh: bool  # 尚未超過 TTL，可不經伺服器直接使用
+
+
+class HttpCache:
+    """
+    SQLite-backed cache of GET response bodies keyed by endpoint and params
+
+    Keys are prefixed with `scope`, e.g. the server URL and account, so
+    responses of a stub server or another account are never served for the
+    real one.
+    """
+
+    def __init__(
+        self,
+        path: str = "cache/http.sqlite3",
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 3600,
+        max_bytes: int = 512 * 1024 * 1024,
+        scope: str = "",
+    ):
+        self.scope = scope
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stale = 0  # 已過期，須向伺服器確認或重新下載
+        self.revalidated = 0
+        self.misses = 0
+        # 本行程所見的快取總大小，第一次寫入時才計算；超過 max_bytes 時才重新統計並清除
+        self._total_bytes: Optional[int] = None
+        # 命中時只記在記憶體，隨下一次寫入或 close 一併更新，讀取不必取得寫入鎖
+        self._accessed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # 分片執行時多個行程共用同一檔案，寫入時等候其他行程的鎖
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self._conn.commit()
+
+    def _key(self, endpoint: str, params: Optional[Dict]) -> str:
+        return f"{self.scope}{endpoint}?{json.dumps(params or {}, sort_keys=True)}"
+
+    def _ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def lookup(self, endpoint: str, params: Optional[Dict]) -> Optional[CachedResponse]:
+        """Return the stored response, fresh or stale, or None if never cached"""
+        key = self._key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM responses "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._accessed[key] = now
+            fresh = row[3] >= now
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale += 1
+        return CachedResponse(row[0], row[1], row[2], fresh)
+
+    def store(
+        self,
+        endpoint: str,
+        params: Optional[Dict],
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        key = self._key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    endpoint,
+                    body,
+                    etag,
+                    last_modified,
+                    now + self._ttl(endpoint),
+                    now,
+                    len(body),
+                ),
+            )
+            self._accessed.pop(key, None)
+            self._flush_accessed()
+            if self._total_bytes is None:
+                self._total_bytes = self._stored_bytes()
+            else:
+                # 取代既有項目時會高估，只會讓下一次的重新統計提早發生
+                self._total_bytes += len(body)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def revalidate(self, endpoint: str, params: Optional[Dict]):
+        """伺服器回覆 304 時延長既有快取的有效期限"""
+        key = self._key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                (now + self._ttl(endpoint), now, key),
+            )
+            self._accessed.pop(key, None)
+            self._flush_accessed()
+            self._conn.commit()
+            self.revalidated += 1
+
+    def _flush_accessed(self):
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed = {}
+
+    def _stored_bytes(self) -> int:
+        # size 存在 BLOB 之後，需讀過每筆內容，因此不在每次寫入時統計
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return total
+
+    def _evict(self):
+        """
+        Delete the least recently used responses down to 90% of max_bytes
+
+        The running total is an estimate: it counts replaced responses twice
+        and misses what other shard processes stored, so it is recounted
+        first. Evicting below the limit keeps the next stores from
+        recounting again right away.
+        """
+        total = self._stored_bytes()
+        if total > self.max_bytes:
+            target = self.max_bytes * 0.9
+            # 依最後存取時間由舊到新刪除，直到總大小低於目標
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at"
+            ).fetchall()
+            evicted = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                evicted.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self._total_bytes = total
+
+    def report(self):
+        logger.info(
+            f"HTTP cache: {self.hits} hits, {self.stale} stale "
+            f"({self.revalidated} revalidated), {self.misses} misses"
+        )
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
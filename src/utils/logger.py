@@ -1,22 +1,185 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import os
+import queue
 import sys
+from datetime import datetime
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
 from pathlib import Path
+from typing import List, Optional
 
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_FILE = "power_station_converter.log"
 
-def setup_logger():
-    # 創建 logs 目錄（如果不存在）
-    Path("logs").mkdir(exist_ok=True)
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler("logs/power_station_converter.log"),
-            logging.StreamHandler(sys.stdout),
-        ],
+# 目前處理中的電站代碼，span 與日誌都會自動歸到該電站
+current_station: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_station", default=None
+)
+
+_listener: Optional[QueueListener] = None
+
+
+class StationFilter(logging.Filter):
+    """在呼叫端的執行緒記下電站代碼，之後交給背景執行緒寫出時 context 已不在"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "station", None) is None:
+            record.station = current_station.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, and when known
+    the station code, its per-stage durations in seconds and the traceback
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        station = getattr(record, "station", None)
+        if station is not None:
+            entry["station"] = station
+        durations = getattr(record, "durations", None)
+        if durations:
+            entry["durations"] = {
+                stage: round(seconds, 6) for stage, seconds in durations.items()
+            }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    QueueHandler that falls back to writing directly in forked children,
+    where the parent's listener thread does not exist
+    """
+
+    def __init__(self, log_queue: queue.Queue, handlers: List[logging.Handler]):
+        super().__init__(log_queue)
+        self._pid = os.getpid()
+        self._handlers = handlers
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 佇列只在同一行程內，不需序列化；先合併參數以免之後被修改，
+        # 保留 exc_info 讓各 formatter 自行輸出 traceback
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        if os.getpid() == self._pid:
+            super().emit(record)
+            return
+        for handler in self._handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def _file_handler(
+    path: Path, max_bytes: int, backup_count: int, when: Optional[str]
+) -> logging.Handler:
+    """when 為 "midnight" 等值時依時間輪替，否則檔案超過 max_bytes 時輪替"""
+    if when:
+        return TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding="utf-8"
+        )
+    return RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
     )
 
 
+def setup_logger(
+    log_dir: str = "logs",
+    filename: str = LOG_FILE,
+    queued: bool = True,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    when: Optional[str] = None,
+    json_path: Optional[str] = None,
+    level: int = logging.INFO,
+):
+    """
+    Log to stdout and a rotating file under log_dir, optionally also to
+    json_path as JSON lines
+
+    With queued set (the default) the root logger only puts records on a
+    queue and a background listener thread does the formatting and I/O, so
+    logging never blocks the stations being processed. The listener is
+    flushed and stopped at exit. Calling this again replaces the previous
+    setup.
+    """
+    global _listener
+
+    # 創建 logs 目錄（如果不存在）
+    Path(log_dir).mkdir(parents=True, exist_ok=True)
+
+    handlers: List[logging.Handler] = [
+        _file_handler(
+            Path(log_dir) / filename,
+            max_bytes,
+            backup_count,
+            when,
+        ),
+        logging.StreamHandler(sys.stdout),
+    ]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    if json_path:
+        Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+        json_handler = _file_handler(Path(json_path), max_bytes, backup_count, when)
+        json_handler.setFormatter(JsonFormatter())
+        handlers.append(json_handler)
+
+    shutdown_logger()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(level)
+
+    if queued:
+        log_queue: queue.Queue = queue.SimpleQueue()
+        queue_handler = _QueueHandler(log_queue, handlers)
+        queue_handler.addFilter(StationFilter())
+        root.addHandler(queue_handler)
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    else:
+        for handler in handlers:
+            handler.addFilter(StationFilter())
+            root.addHandler(handler)
+
+
+def shutdown_logger():
+    """Stop the background listener after it writes every queued record"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logger)
+
+
 def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
     return logger
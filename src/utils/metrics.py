@@ -0,0 +1,217 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Tuple
+from src.utils.logger import current_station, get_logger
+
+logger = get_logger(__name__)
+
+PROMETHEUS_PREFIX = "plant_converter"
+
+_NULL_SPAN = nullcontext()
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Metrics:
+    """
+    Process-wide timing spans and counters, off by default
+
+    While disabled, span() returns a shared no-op context manager and
+    increment() returns immediately, so instrumented code pays one attribute
+    check per call.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._spans: Dict[str, List[float]] = defaultdict(list)
+            self._stations: Dict[str, Dict[str, float]] = defaultdict(
+                lambda: defaultdict(float)
+            )
+            self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(
+                lambda: defaultdict(float)
+            )
+            self._started_at = time.time()
+
+    def enable(self):
+        self.enabled = True
+
+    def span(self, stage: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(stage)
+
+    @contextmanager
+    def _span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage: str):
+        """將整個函式記為一個 span 的裝飾器"""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._span(stage):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @contextmanager
+    def station(self, station_code: str):
+        """Attribute spans recorded inside this block to one station"""
+        token = current_station.set(station_code)
+        try:
+            yield
+        finally:
+            current_station.reset(token)
+
+    def observe(self, stage: str, seconds: float, station: Optional[str] = None):
+        if not self.enabled:
+            return
+        station = station or current_station.get()
+        with self._lock:
+            self._spans[stage].append(seconds)
+            if station is not None:
+                self._stations[station][stage] += seconds
+
+    def increment(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._counters[name][key] += value
+
+    def station_durations(self, station_code: str) -> Dict[str, float]:
+        """Seconds spent per stage on one station so far, empty while disabled"""
+        with self._lock:
+            return dict(self._stations.get(station_code, {}))
+
+    def export_state(self) -> Dict:
+        """Picklable snapshot, used to bring worker-process metrics back"""
+        with self._lock:
+            return {
+                "spans": {stage: list(v) for stage, v in self._spans.items()},
+                "stations": {s: dict(v) for s, v in self._stations.items()},
+                "counters": {n: dict(v) for n, v in self._counters.items()},
+            }
+
+    def merge(self, state: Dict):
+        if not self.enabled:
+            return
+        with self._lock:
+            for stage, samples in state["spans"].items():
+                self._spans[stage].extend(samples)
+            for station, stages in state["stations"].items():
+                for stage, seconds in stages.items():
+                    self._stations[station][stage] += seconds
+            for name, values in state["counters"].items():
+                for key, value in values.items():
+                    self._counters[name][key] += value
+
+    def summary(self) -> Dict:
+        with self._lock:
+            stages = {}
+            for stage, samples in self._spans.items():
+                ordered = sorted(samples)
+                stages[stage] = {
+                    "count": len(ordered),
+                    "total_s": sum(ordered),
+                    "mean_ms": sum(ordered) / len(ordered) * 1000,
+                    "p50_ms": _percentile(ordered, 0.5) * 1000,
+                    "p95_ms": _percentile(ordered, 0.95) * 1000,
+                    "max_ms": ordered[-1] * 1000,
+                }
+            counters = {
+                name: [
+                    {"labels": dict(key), "value": value}
+                    for key, value in sorted(values.items())
+                ]
+                for name, values in self._counters.items()
+            }
+            return {
+                "elapsed_s": time.time() - self._started_at,
+                "stages": stages,
+                "counters": counters,
+                "stations": {s: dict(v) for s, v in self._stations.items()},
+            }
+
+    def log_summary(self):
+        summary = self.summary()
+        logger.info(f"Run metrics ({summary['elapsed_s']:.1f}s elapsed):")
+        for stage, stats in sorted(
+            summary["stages"].items(), key=lambda item: -item[1]["total_s"]
+        ):
+            logger.info(
+                f"  {stage:<20} n={stats['count']:<6} total={stats['total_s']:8.2f}s "
+                f"p50={stats['p50_ms']:8.1f}ms p95={stats['p95_ms']:8.1f}ms"
+            )
+        for name, values in sorted(summary["counters"].items()):
+            for value in values:
+                labels = ",".join(f"{k}={v}" for k, v in value["labels"].items())
+                labels = f"{{{labels}}}" if labels else ""
+                logger.info(f"  {name}{labels} = {value['value']:g}")
+
+    def write_json(self, path: str):
+        _atomic_write(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path: str):
+        """以 node_exporter textfile collector 的格式輸出"""
+        summary = self.summary()
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_stage_seconds Time spent per stage.",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds summary",
+        ]
+        for stage, stats in sorted(summary["stages"].items()):
+            name = f"{PROMETHEUS_PREFIX}_stage_seconds"
+            for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+                lines.append(
+                    f'{name}{{stage="{stage}",quantile="{quantile}"}} '
+                    f"{stats[key] / 1000:.6f}"
+                )
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats["total_s"]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats["count"]}')
+
+        for counter, values in sorted(summary["counters"].items()):
+            name = f"{PROMETHEUS_PREFIX}_{counter}"
+            lines.append(f"# TYPE {name} counter")
+            for value in values:
+                labels = ",".join(f'{k}="{v}"' for k, v in value["labels"].items())
+                labels = f"{{{labels}}}" if labels else ""
+                lines.append(f"{name}{labels} {value['value']:g}")
+
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_run_elapsed_seconds gauge")
+        lines.append(
+            f"{PROMETHEUS_PREFIX}_run_elapsed_seconds {summary['elapsed_s']:.3f}"
+        )
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+
+def _atomic_write(path: str, content: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+metrics = Metrics()
@@ -0,0 +1,282 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from src.utils.logger import get_logger
+from src.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# 視為暫時性錯誤、可重試的狀態碼；429 與 503 另外表示對方要求降速
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose breaker is open"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}, retry in {retry_in:.0f}s")
+        self.host = host
+
+
+class CircuitBreaker:
+    """
+    Stops calling a host after `failure_threshold` consecutive failures
+
+    After `reset_timeout` seconds one probe request is let through; success
+    closes the breaker again, failure reopens it for another timeout.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_timeout=30.0):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.trips = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            waited = time.monotonic() - self._opened_at
+            if self.state == self.OPEN and waited >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.host, max(0.0, self.reset_timeout - waited))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self.trips += 1
+                self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        logger.warning(f"Circuit breaker for {self.host}: {self.state} -> {state}")
+        self.state = state
+        metrics.increment("circuit_breaker_transitions_total", host=self.host, to=state)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on concurrent requests to one host
+
+    Each success raises the limit by 1/limit, about +1 per round of requests;
+    each throttle response halves it. Callers over the limit block.
+    """
+
+    # 上限與連線池大小相同，超過的連線用完即被丟棄
+    def __init__(self, initial: float = 8, minimum: float = 1, maximum: float = 16):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool):
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class HostStats:
+    """
+    Request counters for one host; a request counts as failed when it gives
+    up after retries, hits a non-retryable error or is refused by the breaker
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def add(self, requests: int = 0, retries: int = 0, failures: int = 0):
+        with self._lock:
+            self.requests += requests
+            self.retries += retries
+            self.failures += failures
+
+
+class OutboundClient:
+    """
+    Shared layer for every outbound HTTP request
+
+    Per host it keeps a circuit breaker and an adaptive concurrency limit.
+    Transient failures (connection errors, timeouts, RETRYABLE_STATUSES)
+    are retried up to `max_retries` times with full-jitter exponential
+    backoff, waiting at least as long as the server's Retry-After asks.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        max_retry_after: float = 120.0,
+        timeout: float = 60.0,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=16)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._stats: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host: str):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host)
+                self._limiters[host] = AdaptiveLimiter()
+                self._stats[host] = HostStats()
+            return self._breakers[host], self._limiters[host], self._stats[host]
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        session: Optional[requests.Session] = None,
+        throttled: Optional[Callable[[requests.Response], bool]] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Send a request with retries; returns the last response once it is not
+        retryable or retries run out, and raises the last connection error or
+        CircuitOpenError otherwise
+
+        `throttled` lets a caller flag a 200 response as a rate-limit signal
+        (e.g. Google's OVER_QUERY_LIMIT); such responses are retried too.
+        """
+        session = session or self._session
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc
+        breaker, limiter, stats = self._host_state(host)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                breaker.before_request()
+            except CircuitOpenError:
+                # 重試途中斷路器打開時，這個請求也算失敗
+                stats.add(failures=1)
+                raise
+            limiter.acquire()
+            response, error, throttle = None, None, False
+            try:
+                stats.add(requests=1)
+                response = session.request(method, url, **kwargs)
+                throttle = response.status_code in THROTTLE_STATUSES or bool(
+                    throttled and response.status_code == 200 and throttled(response)
+                )
+            except RETRYABLE_ERRORS as e:
+                error = e
+            except Exception:
+                # 非暫時性的錯誤不重試，但仍須結束斷路器的試探狀態
+                breaker.record_failure()
+                stats.add(failures=1)
+                raise
+            finally:
+                limiter.release(throttle or isinstance(error, requests.Timeout))
+
+            failed = error is not None or response.status_code in RETRYABLE_STATUSES
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if not (failed or throttle):
+                return response
+
+            if attempt == self.max_retries:
+                stats.add(failures=1)
+                if error is not None:
+                    raise error
+                return response
+
+            reason = type(error).__name__ if error else str(response.status_code)
+            delay = self._backoff(attempt, response)
+            stats.add(retries=1)
+            metrics.increment("http_retries_total", host=host, reason=reason)
+            logger.info(
+                f"Retrying {method} {host} in {delay:.1f}s "
+                f"({reason}, attempt {attempt + 1}/{self.max_retries})"
+            )
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+    @staticmethod
+    def _retry_after(response: Optional[requests.Response]) -> Optional[float]:
+        """Retry-After 可能是秒數或 HTTP 日期"""
+        value = response.headers.get("Retry-After") if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def report(self):
+        for host, stats in sorted(self._stats.items()):
+            breaker, limiter = self._breakers[host], self._limiters[host]
+            logger.info(
+                f"Outbound {host}: {stats.requests} requests, {stats.retries} retries, "
+                f"{stats.failures} failed, breaker {breaker.state} "
+                f"({breaker.trips} trips), concurrency limit {limiter.limit:.1f}"
+            )
+
+
+@lru_cache(maxsize=None)
+def get_outbound_client() -> OutboundClient:
+    """每個行程共用一個 client，各主機的斷路器與並行上限因此一致"""
+    return OutboundClient()
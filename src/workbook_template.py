@@ -0,0 +1,57 @@
+import datetime
+import pickle
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+import openpyxl
+from openpyxl.workbook.workbook import Workbook
+from src.basic_info_processor import BasicInfoProcessor
+from src.constants.constants import SheetNames
+from src.device_list_processor import DeviceListProcessor
+from src.sheet_writer import SheetWriter
+
+
+class StationWorkbook(NamedTuple):
+    workbook: Workbook
+    basic_info: SheetWriter
+    device_list: SheetWriter
+
+
+class WorkbookTemplate:
+    """Static skeleton of a station workbook, built once and cloned per station
+
+    The skeleton holds both sheets with their column widths and the complete
+    basic-info layout. It is kept pickled, so a clone is a single
+    pickle.loads instead of rebuilding the workbook, its styles and the
+    static cells for every station.
+    """
+
+    def __init__(self):
+        workbook = openpyxl.Workbook()
+        self._setup(workbook)
+        self._skeleton = pickle.dumps(workbook, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _setup(workbook: Workbook) -> Tuple[SheetWriter, SheetWriter]:
+        basic_info = BasicInfoProcessor().setup_basic_info_sheet(workbook)
+        device_list = DeviceListProcessor(None).setup_device_list_sheet(workbook)
+        return basic_info, device_list
+
+    def new_workbook(self, write_only: bool = False) -> StationWorkbook:
+        if write_only:
+            # write-only 工作簿無法複製，改為逐次建立
+            workbook = openpyxl.Workbook(write_only=True)
+            return StationWorkbook(workbook, *self._setup(workbook))
+
+        workbook = pickle.loads(self._skeleton)
+        workbook.properties.created = datetime.datetime.utcnow()
+        return StationWorkbook(
+            workbook,
+            SheetWriter(workbook[SheetNames.BASIC_INFO.value]),
+            SheetWriter(workbook[SheetNames.DEVICE_LIST.value]),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_workbook_template() -> WorkbookTemplate:
+    """每個行程只建立一次樣板"""
+    return WorkbookTemplate()